@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import statistics
+import subprocess
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import vpol
+
+DEFAULT_THRESHOLD = 0.10
+STARTUP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup.vpol")
+
+class NullOutput:
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+class LocalServers:
+    def __enter__(self):
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+        self.http.daemon_threads = True
+        self.httpThread = threading.Thread(target=self.http.serve_forever, daemon=True)
+        self.httpThread.start()
+        self.httpUrl = f"http://127.0.0.1:{self.http.server_address[1]}/"
+
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind(("127.0.0.1", 0))
+        self.udpPort = self.udp.getsockname()[1]
+        self.udpThread = threading.Thread(target=self.drainUdp, daemon=True)
+        self.udpThread.start()
+        return self
+
+    def drainUdp(self):
+        try:
+            while True:
+                self.udp.recv(65535)
+        except OSError:
+            pass
+
+    def __exit__(self, *exc):
+        self.http.shutdown()
+        self.http.server_close()
+        self.udp.close()
+
+def newProcessor():
+    processor = vpol.VPOLProcessor()
+    processor.output = NullOutput()
+    processor.interactive = False
+    return processor
+
+def runScript(code):
+    processor = newProcessor()
+    exitCode = processor.run(code)
+    if exitCode != vpol.EXIT_OK:
+        raise RuntimeError(f"benchmark script failed with exit code {exitCode}")
+
+def generateScript(lineCount):
+    lines = [
+        '@base = "value"',
+        "${work",
+        '    @tmp = @base + "-" + @v0',
+        "}",
+    ]
+    index = 0
+    while len(lines) < lineCount:
+        slot = index % 100
+        kind = index % 4
+        if kind == 0:
+            lines.append(f'@v{slot} = "item {index} " + @base')
+        elif kind == 1:
+            lines.append(f'terminal.print("line {index}: " + @v{slot - 1 if slot else 0})')
+        elif kind == 2:
+            lines.append("~$work")
+        else:
+            lines.append(f"# comment {index}")
+        index += 1
+    return "\n".join(lines) + "\n"
+
+def concatChain(parts):
+    return " + ".join('@v' if index % 2 == 0 else f'"part{index}"' for index in range(parts))
+
+def functionCallScript(calls):
+    return "\n".join([
+        '@v = "x"',
+        "${leaf",
+        '    @r = @v + "y"',
+        "}",
+    ] + ["~$leaf"] * calls) + "\n"
+
+def loopScript(iterations):
+    return "\n".join([
+        '@v = "x"',
+        f"repeat {iterations}:",
+        '    @r = @v + "y"',
+    ]) + "\n"
+
+def deepCallScript(depth, repeats):
+    lines = ['@v = "x"', "${f0", '    @r = @v', "}"]
+    for level in range(1, depth):
+        lines += [f"${{f{level}", f"    ~$f{level - 1}", "}"]
+    lines += [f"~$f{depth - 1}"] * repeats
+    return "\n".join(lines) + "\n"
+
+def ifChainScript(branches, calls):
+    lines = ['@k = "v' + str(branches // 2) + '"', "${dispatch"]
+    for branch in range(branches):
+        keyword = "if" if branch == 0 else "elseif"
+        lines += [f'    {keyword} @k = "v{branch}":', f'        @r = "{branch}"']
+    lines += ["    else:", '        @r = "none"', "}"]
+    lines += ["~$dispatch"] * calls
+    return "\n".join(lines) + "\n"
+
+def largeJson(items):
+    return json.dumps([{"id": index, "name": f"item{index}", "tags": ["a", "b", "c"], "nested": {"value": index * 1.5}} for index in range(items)])
+
+def timeCall(function, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+class Suite:
+    def __init__(self, quick, selected):
+        self.quick = quick
+        self.selected = selected
+        self.results = {}
+        self.skipped = {}
+        self.failed = {}
+
+    def wants(self, name):
+        return not self.selected or any(pattern in name for pattern in self.selected)
+
+    def measure(self, name, function, repeat=5):
+        if not self.wants(name):
+            return
+        try:
+            function()
+            runs = timeCall(function, repeat)
+        except PermissionError as e:
+            self.skipped[name] = str(e)
+            print(f"  {name:<40} skipped: {e}", file=sys.stderr)
+            return
+        except Exception as e:
+            self.failed[name] = str(e) or type(e).__name__
+            print(f"  {name:<40} FAILED: {self.failed[name]}", file=sys.stderr)
+            return
+        self.results[name] = {
+            "unit": "s",
+            "median": statistics.median(runs),
+            "min": min(runs),
+            "mean": statistics.fmean(runs),
+            "runs": runs,
+        }
+        print(f"  {name:<40} {statistics.median(runs) * 1000:10.3f} ms", file=sys.stderr)
+
+    def run(self):
+        sizes = [10_000] if self.quick else [10_000, 100_000, 1_000_000]
+        for size in sizes:
+            code = generateScript(size)
+            repeat = 5 if size <= 100_000 else 1
+            self.measure(f"run.script_{size}_lines", lambda code=code: runScript(code), repeat)
+            self.measure(f"compile.script_{size}_lines", lambda code=code: newProcessor().compile(code), repeat)
+
+        for parts in (100, 1_000, 10_000):
+            processor = newProcessor()
+            processor.vars["v"] = "value"
+            text = concatChain(parts)
+            expression = vpol.compileExpression(text, processor.slotTable)
+            self.measure(f"evaluate.concat_{parts}_parts", lambda expression=expression, processor=processor: [expression.evaluate(processor) for _ in range(100)])
+            self.measure(f"compile_expression.concat_{parts}_parts", lambda text=text: vpol.compileExpression(text, vpol.SlotTable()))
+
+        calls = 10_000 if self.quick else 100_000
+        self.measure(f"call.repeated_{calls}", lambda code=functionCallScript(calls): runScript(code))
+        self.measure(f"loop.repeat_{calls}", lambda code=loopScript(calls): runScript(code))
+        self.measure("call.deep_200_x_100", lambda code=deepCallScript(200, 100): runScript(code))
+
+        self.measure(f"if.chain_50_branches_x_{calls // 10}", lambda code=ifChainScript(50, calls // 10): runScript(code))
+
+        for items in ((10_000,) if self.quick else (10_000, 200_000)):
+            document = largeJson(items)
+
+            def parseDocument(document=document):
+                processor = newProcessor()
+                processor.vars["doc"] = document
+                processor.run("json.parse(@doc)")
+            self.measure(f"json.parse_{items}_items", parseDocument, 3)
+
+        self.measure("startup.import_vpol", lambda: subprocess.run([sys.executable, "-c", "import vpol"], cwd=REPO_DIR, check=True), 5)
+        self.measure("startup.print_script", lambda: subprocess.run([sys.executable, os.path.join(REPO_DIR, "vpol.py"), "--no-cache", STARTUP_SCRIPT], capture_output=True, check=True), 5)
+
+        with LocalServers() as servers:
+            requests = 50 if self.quick else 500
+            self.measure(f"network.http_check_{requests}", lambda: runScript(f'@url = "{servers.httpUrl}"\n' + "network.http_check(@url)\n" * requests), 3)
+            urls = ", ".join([servers.httpUrl] * requests)
+            self.measure(f"network.http_check_many_{requests}", lambda: runScript(f'network.http_check_many("{urls}") @r\n'), 3)
+            self.measure("network.ping_loopback_10", lambda: runScript('network.ping("127.0.0.1", count=10, interval=0, timeout=1) @p\n'), 3)
+            packets = 1_000 if self.quick else 20_000
+            self.measure(f"network.send_packet_udp_{packets}", lambda: runScript(f'network.send_packet("127.0.0.1, {servers.udpPort}, udp, 64", count={packets}) @s\n'), 3)
+
+def commandRun(args):
+    suite = Suite(args.quick, args.filter)
+    print("Running VPOL benchmarks...", file=sys.stderr)
+    suite.run()
+    report = {
+        "meta": {
+            "vpol_version": vpol.VPOL_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": args.quick,
+            "filter": args.filter,
+        },
+        "results": suite.results,
+        "skipped": suite.skipped,
+        "failed": suite.failed,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    if suite.failed:
+        print(f"{len(suite.failed)} benchmark(s) failed: {', '.join(sorted(suite.failed))}", file=sys.stderr)
+        return 1
+    return 0
+
+def commandCompare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.current) as f:
+        report = json.load(f)
+    current = report["results"]
+    failed = report.get("failed", {})
+    skipped = report.get("skipped", {})
+    selected = report.get("meta", {}).get("filter", [])
+
+    regressions = []
+    broken = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(set(baseline) | set(current) | set(failed)):
+        if name not in current and name not in failed and (name in skipped or (selected and not any(pattern in name for pattern in selected))):
+            print(f"{name:<40} {'skipped':>12}")
+            continue
+        if name in failed or name not in current:
+            state = "failed" if name in failed else "missing"
+            print(f"{name:<40} {state:>12}")
+            broken.append(name)
+            continue
+        if name not in baseline:
+            print(f"{name:<40} {'new':>12}")
+            continue
+        before = baseline[name][args.metric]
+        after = current[name][args.metric]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<40} {before * 1000:10.3f}ms {after * 1000:10.3f}ms {change * 100:+8.1f}%{flag}")
+
+    if broken:
+        print(f"\n{len(broken)} benchmark(s) failed or missing: {', '.join(broken)}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+    if broken or regressions:
+        return 1
+    print(f"\nNo regressions above {args.threshold * 100:.0f}%")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="VPOL interpreter benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runParser = commands.add_parser("run", help="run the benchmark suite")
+    runParser.add_argument("--output", default="bench_results.json", help="results JSON path (default: %(default)s)")
+    runParser.add_argument("--quick", action="store_true", help="use small inputs only")
+    runParser.add_argument("--filter", action="append", default=[], metavar="TEXT", help="only run benchmarks whose name contains TEXT")
+
+    compareParser = commands.add_parser("compare", help="compare results against a baseline")
+    compareParser.add_argument("baseline", help="baseline results JSON")
+    compareParser.add_argument("current", help="current results JSON")
+    compareParser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="relative slowdown reported as a regression (default: %(default)s)")
+    compareParser.add_argument("--metric", choices=("median", "min", "mean"), default="median", help="statistic to compare (default: %(default)s)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(commandRun(args))
+    sys.exit(commandCompare(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,459 @@
 #!/usr/bin/env python
+import time
+STARTUP_BEGIN = time.perf_counter()
+
 import re
 import json
 import os
 import sys
 import subprocess
-import requests
-from colorama import init, Fore, Style
-from scapy.all import IP, TCP, UDP, send, sr1
+import hashlib
+import marshal
+import gc
+import argparse
+import importlib
+import threading
+import socket
+import select
+import struct
+import stat
+import ipaddress
+import queue
+import socketserver
+import glob
+import io
+import csv
+import traceback
+import operator
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+VPOL_VERSION = "1.0"
+BYTECODE_VERSION = 13
+CACHE_DIR_NAME = "__vpolcache__"
+CACHE_SUFFIX = ".vpolc"
+CACHE_MAGIC = "VPOLC"
+NODE_LITERAL, NODE_VARIABLE, NODE_CONCAT, NODE_COMPARISON, NODE_INSTRUCTION, NODE_TUPLE, NODE_LIST = range(7)
+PARALLEL_OPS = ('ping', 'http', 'http_many', 'packet', 'scan')
+NETWORK_OPS = frozenset(PARALLEL_OPS + ('parallel',))
+PROFILE_REPORT_ROWS = 25
+MAX_TRACE_EVENTS = 1000000
+BUFFERING_MODES = ('auto', 'line', 'block', 'full')
+OUTPUT_BLOCK_SIZE = 8192
+OUTPUT_FULL_LIMIT = 1 << 20
+STREAM_SCRIPT_SIZE = 4 << 20
+JSON_CHUNK_SIZE = 1 << 16
+JSON_ITEM_LIMIT = 64 << 20
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+JSON_FORMATS = ('auto', 'json', 'ndjson')
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_SERVER_WORKERS = 4
+SERVER_PROGRAM_CACHE_SIZE = 256
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_CRASH = 2
+EXIT_TIMEOUT = 3
+EXIT_NETWORK_TIMEOUT = 4
+EXIT_CALL_DEPTH = 5
+EXIT_STATEMENT_LIMIT = 6
+EXIT_OUTPUT_LIMIT = 7
+DEFAULT_MAX_CALL_DEPTH = 200
+AWAITED_OPS = PARALLEL_OPS + ('parallel', 'input')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+STATEMENT_PREFIXES = ('if', 'elseif', 'terminal.print', 'terminal.set_title', 'terminal.flush', 'json.parse', 'json.get', 'json.load_file', 'network.ping', 'network.http_check_many', 'network.http_check', 'network.scan', 'network.send_packet', 'terminal.input', 'spawn', 'parallel', 'repeat')
+STATEMENT_KEYWORDS = frozenset(STATEMENT_PREFIXES + ('else', 'cls', 'for', 'every', 'after'))
+CALL_FRAMES = 6
+BUDGET_ARGUMENTS = {
+    'timeout': 'scriptTimeout',
+    'network_timeout': 'networkTimeout',
+    'max_call_depth': 'maxCallDepth',
+    'max_statements': 'maxStatements',
+    'max_output': 'maxOutputBytes',
+}
+DEFAULT_HTTP_TIMEOUT = 5.0
+HTTP_METHODS = ('GET', 'HEAD')
+DEFAULT_PING_COUNT = 4
+DEFAULT_PING_INTERVAL = 1.0
+DEFAULT_PING_TIMEOUT = 2.0
+DEFAULT_PACKET_TIMEOUT = 2.0
+DEFAULT_SCAN_TIMEOUT = 2.0
+SCAN_OPTIONS = ('timeout', 'rate')
+SCAN_STATES = ('open', 'closed', 'filtered', 'open_filtered')
+PACKET_OPTIONS = ('count', 'rate', 'wait', 'timeout')
+PING_OPTIONS = ('count', 'interval', 'timeout', 'cache')
+HTTP_OPTIONS = ('timeout', 'method', 'cache')
+DNS_CACHE_TTL = 60.0
+DNS_NEGATIVE_TTL = 5.0
+DNS_CACHE_SIZE = 1024
+RESULT_CACHE_SIZE = 1024
+
+BACKEND_LABELS = {
+    'colorama': "terminal colors (colorama)",
+    'requests': "http (requests)",
+    'scapy.all': "packets (scapy)",
+    'asyncio': "scheduler (asyncio)",
+}
+STARTUP_TIMES = {"core": time.perf_counter() - STARTUP_BEGIN}
+loadedBackends = {}
+callDepth = contextvars.ContextVar('callDepth', default=0)
+
+def loadBackend(name):
+    module = loadedBackends.get(name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        if name == 'colorama':
+            module.init(autoreset=True)
+        STARTUP_TIMES[BACKEND_LABELS.get(name, name)] = time.perf_counter() - start
+        loadedBackends[name] = module
+    return module
+
+INFINITY = float('inf')
+
+def formatValue(value):
+    if isinstance(value, str):
+        return value
+    if value.__class__ is int:
+        return str(value)
+    if value.__class__ is float and -INFINITY < value < INFINITY:
+        return repr(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return json.dumps(value, default=str)
+
+NUMBER_TYPES = (int, float)
+numberPattern = re.compile(r'-?\d+(\.\d+)?')
+concatTokenPattern = re.compile(r'"[^"]*"?|\'[^\']*\'?|[^"\'+]+|\+')
+keywordPattern = re.compile(r'[\w.]+')
+commentPattern = re.compile(r'(?:"[^"]*"?|\'[^\']*\'?|[^"\'\s]+|\s+(?!\s|#(?!\S)))*')
+printPattern = re.compile(r'terminal\.print\((.*)\)')
+titlePattern = re.compile(r'terminal\.set_title\((.*)\)')
+UNSET = object()
+
+class SlotTable:
+    __slots__ = ('names', 'slots', 'variables', 'lock')
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.slots = {name: slot for slot, name in enumerate(self.names)}
+        self.variables = {}
+        self.lock = threading.Lock()
+
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            with self.lock:
+                slot = self.slots.get(name)
+                if slot is None:
+                    slot = len(self.names)
+                    self.names.append(name)
+                    self.slots[name] = slot
+        return slot
+
+    def variable(self, name):
+        variable = self.variables.get(name)
+        if variable is None:
+            variable = self.variables.setdefault(name, Variable(name, self.slot(name)))
+        return variable
+
+class Program(list):
+    __slots__ = ('table',)
+
+    def __init__(self, instructions=(), table=None):
+        super().__init__(instructions)
+        self.table = SlotTable() if table is None else table
+
+class VariableStore:
+    __slots__ = ('table', 'values')
+
+    def __init__(self, table=None):
+        self.table = SlotTable() if table is None else table
+        self.values = []
+
+    def assign(self, slot, value):
+        values = self.values
+        if slot >= len(values):
+            values.extend([UNSET] * (slot + 1 - len(values)))
+        values[slot] = value
+
+    def __setitem__(self, name, value):
+        self.assign(self.table.slot(name), value)
+
+    def __getitem__(self, name):
+        slot = self.table.slots.get(name)
+        if slot is not None and slot < len(self.values) and self.values[slot] is not UNSET:
+            return self.values[slot]
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def items(self):
+        names = self.table.names
+        return [(names[slot], value) for slot, value in enumerate(self.values) if value is not UNSET]
+
+    def __iter__(self):
+        return iter([name for name, _ in self.items()])
+
+    def __len__(self):
+        return len(self.items())
+
+def splitArgs(text):
+    args = []
+    current = []
+    quote = None
+    depth = 0
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            args.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    last = ''.join(current).strip()
+    if last or args:
+        args.append(last)
+    return args
+
+def splitConcat(text):
+    parts = text.split('+')
+    if "'" not in text:
+        for part in parts:
+            if part.count('"') % 2:
+                break
+        else:
+            return [part.strip() for part in parts]
+    parts = []
+    current = ''
+    for token in concatTokenPattern.findall(text):
+        if token == '+':
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += token
+    parts.append(current.strip())
+    return parts
 
-init(autoreset=True)
+class Literal:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, processor):
+        return self.value
+
+class Variable:
+    __slots__ = ('name', 'slot')
+
+    def __init__(self, name, slot):
+        self.name = name
+        self.slot = slot
+
+    def evaluate(self, processor):
+        try:
+            value = processor.values[self.slot]
+        except IndexError:
+            value = UNSET
+        if value is UNSET:
+            raise VPOLException(f"Variable '{self.name}' not defined.")
+        return value
+
+class Concat:
+    __slots__ = ('parts',)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def evaluate(self, processor):
+        values = [part.evaluate(processor) for part in self.parts]
+        return ''.join([value if value.__class__ is str else formatValue(value) for value in values])
+
+def compileTerm(text, table):
+    first = text[:1]
+    if first == '@':
+        return table.variable(text[1:])
+    if first in ('"', "'") and len(text) >= 2 and text[-1] == first and text.count(first) == 2:
+        return Literal(text[1:-1])
+    if numberPattern.fullmatch(text):
+        value = float(text) if '.' in text else int(text)
+        if str(value) == text:
+            return Literal(value)
+    return Literal(text.strip('"'))
+
+def compileExpression(text, table):
+    text = text.strip()
+    if '+' not in text:
+        return compileTerm(text, table)
+
+    merged = []
+    for text in splitConcat(text):
+        part = compileTerm(text, table)
+        if merged and part.__class__ is Literal and merged[-1].__class__ is Literal:
+            merged[-1] = Literal(formatValue(merged[-1].value) + formatValue(part.value))
+        else:
+            merged.append(part)
+    if len(merged) == 1:
+        return merged[0]
+    return Concat(merged)
+
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '>': operator.gt,
+}
+
+class Comparison:
+    __slots__ = ('left', 'symbol', 'compare', 'right')
+
+    def __init__(self, left, symbol, right):
+        self.left = left
+        self.symbol = symbol
+        self.compare = COMPARISONS[symbol]
+        self.right = right
+
+    def evaluate(self, processor):
+        left = self.left.evaluate(processor)
+        right = self.right.evaluate(processor)
+        if left.__class__ in NUMBER_TYPES and right.__class__ in NUMBER_TYPES:
+            return self.compare(left, right)
+        left = formatValue(left)
+        right = formatValue(right)
+        if self.symbol == '==':
+            return left == right
+        if self.symbol == '!=':
+            return left != right
+        try:
+            return self.compare(float(left), float(right))
+        except ValueError:
+            raise VPOLException(f"'{self.symbol}' needs numbers, got '{left}' and '{right}'")
+
+def splitCondition(text):
+    quote = None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '=!<>':
+            symbol = text[index:index + 2] if text[index:index + 2] in COMPARISONS else char
+            if symbol == '!':
+                break
+            return text[:index], '==' if symbol == '=' else symbol, text[index + len(symbol):]
+    raise VPOLException("Invalid condition: expected a comparison using ==, !=, <, <=, > or >=")
+
+def compileOptionalExpression(text, table):
+    return None if text is None else compileExpression(text, table)
+
+def compileDuration(text, table):
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*(ms|s|m|h)', text.strip())
+    if match:
+        return Literal(float(match.group(1)) * DURATION_UNITS[match.group(2)])
+    return compileExpression(text, table)
+
+def parseCallArgs(text):
+    positional = []
+    options = {}
+    for arg in splitArgs(text):
+        match = re.fullmatch(r'(\w+)\s*=\s*(.+)', arg)
+        if match:
+            options[match.group(1)] = match.group(2).strip()
+        else:
+            positional.append(arg)
+    return positional, options
+
+def printStartupProfile():
+    print("VPOL startup profile:", file=sys.stderr)
+    for label, seconds in STARTUP_TIMES.items():
+        print(f"  {label:<28} {seconds * 1000:9.2f} ms", file=sys.stderr)
+    for name, label in BACKEND_LABELS.items():
+        if name not in loadedBackends:
+            print(f"  {label:<28} {'not loaded':>12}", file=sys.stderr)
 
 class VPOLException(Exception):
-    def __init__(self, message):
+    exitCode = EXIT_ERROR
+
+    def __init__(self, message, lineNum=None):
         self.message = message
+        self.lineNum = lineNum
+
+class ScriptTimeout(VPOLException):
+    exitCode = EXIT_TIMEOUT
+
+class NetworkTimeout(VPOLException):
+    exitCode = EXIT_NETWORK_TIMEOUT
+
+class CallDepthExceeded(VPOLException):
+    exitCode = EXIT_CALL_DEPTH
+
+class StatementLimitExceeded(VPOLException):
+    exitCode = EXIT_STATEMENT_LIMIT
+
+class OutputLimitExceeded(VPOLException):
+    exitCode = EXIT_OUTPUT_LIMIT
+
+def duration(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {text}")
+    return value
+
+def addBudgetArguments(parser):
+    parser.add_argument("--timeout", type=duration, default=None, metavar="SECONDS", help="stop a script that runs longer than SECONDS")
+    parser.add_argument("--network-timeout", type=duration, default=None, metavar="SECONDS", help="stop a network statement that runs longer than SECONDS")
+    parser.add_argument("--max-call-depth", type=int, default=DEFAULT_MAX_CALL_DEPTH, metavar="N", help="maximum nesting of function calls (default: %(default)s)")
+    parser.add_argument("--max-statements", type=int, default=None, metavar="N", help="stop a script after executing N statements")
+    parser.add_argument("--max-output", type=int, default=None, metavar="BYTES", help="stop a script once its output exceeds BYTES")
+
+def budgetSettings(args):
+    return {attribute: getattr(args, name) for name, attribute in BUDGET_ARGUMENTS.items()}
+
+class OutputBuffer:
+    def __init__(self, stream, mode='auto'):
+        self.stream = stream
+        if mode == 'auto':
+            isTerminal = getattr(stream, 'isatty', None)
+            mode = 'line' if isTerminal and isTerminal() else 'full'
+        self.mode = mode
+        self.limit = {'line': 0, 'block': OUTPUT_BLOCK_SIZE, 'full': OUTPUT_FULL_LIMIT}[mode]
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size > self.limit:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.stream.flush()
 
 class TerminalUtils:
     @staticmethod
@@ -22,290 +463,2556 @@ class TerminalUtils:
         else:
             print(f"\033]0;{title}\a", end='')
 
+class Instruction:
+    __slots__ = ('op', 'args', 'lineNum')
+
+    def __init__(self, op, args, lineNum):
+        self.op = op
+        self.args = args
+        self.lineNum = lineNum
+
+    def __repr__(self):
+        return f"Instruction({self.op!r}, {self.args!r}, line {self.lineNum})"
+
+def parseJsonPath(path):
+    steps = []
+    position = 0
+    pattern = re.compile(r'\.?([^.\[\]]+)|\[(-?\d+)\]|\["([^"]*)"\]')
+    while position < len(path):
+        match = pattern.match(path, position)
+        if not match or match.end() == position:
+            raise VPOLException(f"Invalid JSON path '{path}'")
+        if match.group(2) is not None:
+            steps.append(int(match.group(2)))
+        else:
+            steps.append(match.group(1) if match.group(1) is not None else match.group(3))
+        position = match.end()
+    return tuple(steps)
+
+def queryJson(value, steps, path):
+    for step in steps:
+        try:
+            if isinstance(value, JsonStream):
+                value = value.item(step)
+            elif isinstance(step, int):
+                if not isinstance(value, list):
+                    raise TypeError
+                value = value[step]
+            else:
+                if not isinstance(value, dict):
+                    raise TypeError
+                value = value[step]
+        except (KeyError, IndexError, TypeError):
+            raise VPOLException(f"JSON path '{path}' not found")
+    return value
+
+def iterJsonArray(f):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = f.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+        if len(buffer) > JSON_ITEM_LIMIT:
+            raise VPOLException(f"Invalid JSON format: array item larger than {JSON_ITEM_LIMIT >> 20} MiB")
+
+    def skipWhitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    skipWhitespace()
+    if position >= len(buffer) or buffer[position] != '[':
+        raise VPOLException("Expected a JSON array")
+    position += 1
+
+    skipWhitespace()
+    if position < len(buffer) and buffer[position] == ']':
+        return
+
+    while True:
+        skipWhitespace()
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            complete = False
+            if eof:
+                raise VPOLException("Invalid JSON format")
+        if not complete:
+            fill()
+            continue
+        yield value
+        position = end
+        skipWhitespace()
+        if position >= len(buffer):
+            raise VPOLException("Invalid JSON format: unterminated array")
+        if buffer[position] == ']':
+            return
+        if buffer[position] != ',':
+            raise VPOLException("Invalid JSON format")
+        position += 1
+
+def iterNdjson(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                raise VPOLException("Invalid JSON format")
+
+class JsonStream:
+    def __init__(self, path, ndjson):
+        self.path = path
+        self.ndjson = ndjson
+        self.cursor = None
+        self.nextIndex = 0
+        self.current = None
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            yield from (iterNdjson(f) if self.ndjson else iterJsonArray(f))
+
+    def item(self, index):
+        if not isinstance(index, int) or index < 0:
+            raise TypeError
+        with self.lock:
+            if self.cursor is not None and index == self.nextIndex - 1:
+                return self.current
+            cursor, self.cursor = self.cursor, None
+            if cursor is None or index < self.nextIndex:
+                cursor = iter(self)
+                self.nextIndex = 0
+            for value in cursor:
+                self.nextIndex += 1
+                if self.nextIndex > index:
+                    self.cursor = cursor
+                    self.current = value
+                    return value
+        raise IndexError
+
+    def __str__(self):
+        return f"<JSON stream {self.path}>"
+
+def loadJsonFile(path, format='auto'):
+    if format not in JSON_FORMATS:
+        raise VPOLException(f"Unknown JSON format '{format}'")
+    if format == 'auto':
+        format = 'ndjson' if path.lower().endswith(NDJSON_EXTENSIONS) else 'json'
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if format == 'ndjson':
+                return JsonStream(path, True)
+            first = f.read(JSON_CHUNK_SIZE)
+            if first.lstrip().startswith('['):
+                return JsonStream(path, False)
+            try:
+                return json.loads(first + f.read())
+            except json.JSONDecodeError:
+                raise VPOLException("Invalid JSON format")
+    except OSError as e:
+        raise VPOLException(f"Cannot read JSON file '{path}': {e.strerror}")
+
+class PingEngine:
+    ECHO_REQUEST = 8
+    ECHO_REPLY = 0
+
+    def __init__(self):
+        self.sock = None
+        self.raw = False
+        for sockType in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                self.sock = socket.socket(socket.AF_INET, sockType, socket.IPPROTO_ICMP)
+                self.raw = sockType == socket.SOCK_RAW
+                break
+            except OSError:
+                continue
+
+    def available(self):
+        return self.sock is not None
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    @staticmethod
+    def checksum(data):
+        if len(data) % 2:
+            data += b"\0"
+        total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def echoRequest(self, ident, seq):
+        payload = b"VPOL" * 8
+        header = struct.pack("!BBHHH", self.ECHO_REQUEST, 0, 0, ident, seq)
+        checksum = self.checksum(header + payload)
+        return struct.pack("!BBHHH", self.ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+    def ping(self, addresses, count, interval, timeout, limit=None):
+        ident = (os.getpid() ^ threading.get_ident()) & 0xFFFF
+        pending = {}
+        rtts = {address: [] for address in addresses}
+        stop = None if limit is None else time.perf_counter() + limit
+
+        for seq in range(count):
+            roundStart = time.perf_counter()
+            if stop is not None and roundStart >= stop:
+                break
+            packet = self.echoRequest(ident, seq)
+            for address in addresses:
+                try:
+                    self.sock.sendto(packet, (address, 0))
+                    pending[(address, seq)] = time.perf_counter()
+                except OSError:
+                    pass
+            if not pending:
+                continue
+            lastRound = seq == count - 1
+            roundEnd = roundStart + (timeout if lastRound else interval)
+            self.collect(pending, rtts, ident, roundEnd if stop is None else min(roundEnd, stop), lastRound)
+
+        return rtts
+
+    def collect(self, pending, rtts, ident, deadline, stopWhenDone):
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or (stopWhenDone and not pending):
+                return
+            readable, _, _ = select.select([self.sock], [], [], remaining)
+            if not readable:
+                continue
+            try:
+                data, (source, _) = self.sock.recvfrom(2048)
+            except OSError:
+                continue
+            received = time.perf_counter()
+            if self.raw:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+            icmpType, _, _, replyIdent, seq = struct.unpack("!BBHHH", data[:8])
+            if icmpType != self.ECHO_REPLY or (self.raw and replyIdent != ident):
+                continue
+            sent = pending.pop((source, seq), None)
+            if sent is not None:
+                rtts[source].append(received - sent)
+
+def pingBinary(address, count, interval, timeout, limit=None):
+    if os.name == 'nt':
+        command = ['ping', '-n', str(count), '-w', str(int(timeout * 1000)), address]
+    else:
+        command = ['ping', '-c', str(count), '-i', str(interval), '-W', str(max(1, int(round(timeout)))), address]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=limit)
+    except subprocess.TimeoutExpired:
+        return []
+    except OSError as e:
+        raise VPOLException(f"Failed to ping {address}: {e}")
+    return [float(rtt) / 1000 for rtt in re.findall(r'time[=<]\s*([\d.]+)\s*ms', output.stdout)]
+
+def pingStats(host, address, count, rtts):
+    received = min(len(rtts), count)
+    stats = {
+        "host": host,
+        "address": address,
+        "sent": count,
+        "received": received,
+        "loss": round(100.0 * (count - received) / count, 1),
+        "min": None,
+        "avg": None,
+        "max": None,
+    }
+    if rtts:
+        stats["min"] = round(min(rtts) * 1000, 3)
+        stats["avg"] = round(sum(rtts) / len(rtts) * 1000, 3)
+        stats["max"] = round(max(rtts) * 1000, 3)
+    return stats
+
+def parsePorts(value):
+    try:
+        if '-' in value:
+            first, last = (int(part) for part in value.split('-', 1))
+            ports = list(range(first, last + 1))
+        else:
+            ports = [int(value)]
+    except ValueError:
+        raise VPOLException(f"Invalid port '{value}'")
+    if not ports or ports[0] < 0 or ports[-1] > 65535:
+        raise VPOLException(f"Invalid port range '{value}'")
+    return ports
+
+def parsePortList(value):
+    items = value if isinstance(value, list) else str(value).split(',')
+    ports = []
+    for item in items:
+        item = str(item).strip()
+        if item:
+            ports.extend(parsePorts(item))
+    if not ports:
+        raise VPOLException("scan requires at least one port")
+    return list(dict.fromkeys(ports))
+
+def classifyScanReply(scapy, protocol, reply):
+    if reply.haslayer(scapy.TCP):
+        flags = int(reply[scapy.TCP].flags)
+        if flags & 0x12 == 0x12:
+            return 'open'
+        if flags & 0x04:
+            return 'closed'
+        return 'filtered'
+    if reply.haslayer(scapy.UDP):
+        return 'open'
+    if reply.haslayer(scapy.ICMP) and int(reply[scapy.ICMP].type) == 3:
+        return 'closed' if protocol == 'udp' and int(reply[scapy.ICMP].code) == 3 else 'filtered'
+    return 'filtered'
+
+def openPacketSender(scapy, packets, ip):
+    frames = [bytes(packet) for packet in packets]
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+    except (OSError, AttributeError):
+        sock = scapy.conf.L3socket()
+        return (lambda index: sock.send(packets[index % len(packets)])), sock.close, frames
+    address = (ip, 0)
+    return (lambda index: sock.sendto(frames[index % len(frames)], address)), sock.close, frames
+
+def sendBatched(send, total, rate, limit=None):
+    start = time.perf_counter()
+    if not rate and limit is None:
+        for index in range(total):
+            send(index)
+        return time.perf_counter() - start
+
+    batchSize = max(1, int(rate / 100)) if rate else 1000
+    sent = 0
+    while sent < total:
+        if limit is not None and time.perf_counter() - start >= limit:
+            raise NetworkTimeout(f"send_packet stopped after {sent} of {total} packets: time limit reached")
+        batchEnd = min(sent + batchSize, total)
+        for index in range(sent, batchEnd):
+            send(index)
+        sent = batchEnd
+        if not rate:
+            continue
+        delay = start + sent / rate - time.perf_counter()
+        if limit is not None:
+            delay = min(delay, start + limit - time.perf_counter())
+        if delay > 0:
+            time.sleep(delay)
+    return time.perf_counter() - start
+
+class Profiler:
+    def __init__(self, sourceLines=None, trace=False):
+        self.sourceLines = sourceLines or []
+        self.trace = trace
+        self.lineStats = {}
+        self.functionStats = {}
+        self.events = []
+        self.droppedEvents = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+
+    def enter(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        stack.append([0.0, 0.0, 0.0])
+
+    def leave(self, instruction, start, end):
+        stack = self.local.stack
+        childTime, networkTime, callTime = stack.pop()
+        elapsed = end - start
+        if instruction.op in NETWORK_OPS:
+            networkTime = elapsed
+        if stack:
+            parent = stack[-1]
+            parent[0] += elapsed
+            parent[1] += networkTime
+            parent[2] += elapsed if instruction.op == 'call' else callTime
+
+        with self.lock:
+            stats = self.lineStats.get(instruction.lineNum)
+            if stats is None:
+                stats = self.lineStats[instruction.lineNum] = [0, 0.0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - childTime
+            stats[3] += networkTime
+
+            if instruction.op == 'call':
+                name = instruction.args[0]
+                stats = self.functionStats.get(name)
+                if stats is None:
+                    stats = self.functionStats[name] = [0, 0.0, 0.0, 0.0]
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += elapsed - callTime
+                stats[3] += networkTime
+
+            if self.trace:
+                if len(self.events) < MAX_TRACE_EVENTS:
+                    self.events.append((instruction, start, elapsed, threading.get_ident()))
+                else:
+                    self.droppedEvents += 1
+
+    def sourceText(self, lineNum):
+        if 0 < lineNum <= len(self.sourceLines):
+            return self.sourceLines[lineNum - 1].strip()
+        return ""
+
+    def report(self, stream):
+        def milliseconds(seconds):
+            return f"{seconds * 1000:10.3f}"
+
+        print("VPOL profile: statements by self time", file=stream)
+        print(f"{'line':>6} {'count':>9} {'total ms':>10} {'self ms':>10} {'net ms':>10}  source", file=stream)
+        rows = sorted(self.lineStats.items(), key=lambda item: item[1][2], reverse=True)
+        for lineNum, (count, total, selfTime, network) in rows[:PROFILE_REPORT_ROWS]:
+            print(f"{lineNum:>6} {count:>9} {milliseconds(total)} {milliseconds(selfTime)} {milliseconds(network)}  {self.sourceText(lineNum)[:60]}", file=stream)
+
+        if self.functionStats:
+            print("\nVPOL profile: functions by total time", file=stream)
+            print(f"{'function':<24} {'calls':>9} {'total ms':>10} {'self ms':>10} {'net ms':>10}", file=stream)
+            rows = sorted(self.functionStats.items(), key=lambda item: item[1][1], reverse=True)
+            for name, (count, total, selfTime, network) in rows[:PROFILE_REPORT_ROWS]:
+                print(f"{name:<24} {count:>9} {milliseconds(total)} {milliseconds(selfTime)} {milliseconds(network)}", file=stream)
+
+    def writeTrace(self, path):
+        pid = os.getpid()
+        events = []
+        for instruction, start, elapsed, threadId in self.events:
+            if instruction.op == 'call':
+                name = f"~${instruction.args[0]}"
+                category = "function"
+            else:
+                name = f"line {instruction.lineNum}: {instruction.op}"
+                category = "network" if instruction.op in NETWORK_OPS else "statement"
+            events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 3),
+                "dur": round(elapsed * 1e6, 3),
+                "pid": pid,
+                "tid": threadId,
+                "args": {"line": instruction.lineNum, "source": self.sourceText(instruction.lineNum)},
+            })
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"droppedEvents": self.droppedEvents}}, f)
+
+class MemoryCache:
+    def __init__(self, maxEntries=SERVER_PROGRAM_CACHE_SIZE):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def key(self, code):
+        return hashlib.sha256(code.encode('utf-8', 'surrogatepass')).digest()
+
+    def load(self, code):
+        key = self.key(code)
+        with self.lock:
+            instructions = self.entries.get(key)
+            if instructions is not None:
+                self.entries.move_to_end(key)
+            return instructions
+
+    def store(self, code, instructions):
+        key = self.key(code)
+        with self.lock:
+            self.entries[key] = instructions
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+class TtlCache:
+    def __init__(self, maxEntries):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[1]
+                del self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def cachedResolverAdapter(requests, resolve, poolSize):
+    urllib3 = importlib.import_module('urllib3')
+
+    class ResolvingConnection:
+        def _new_conn(self):
+            hostName = self._dns_host
+            address = resolve(self.host)
+            if address:
+                self._dns_host = address
+            try:
+                return super()._new_conn()
+            finally:
+                self._dns_host = hostName
+
+    class HTTPConnection(ResolvingConnection, urllib3.connection.HTTPConnection):
+        pass
+
+    class HTTPSConnection(ResolvingConnection, urllib3.connection.HTTPSConnection):
+        pass
+
+    class HTTPConnectionPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = HTTPConnection
+
+    class HTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = HTTPSConnection
+
+    class ResolvingAdapter(requests.adapters.HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {'http': HTTPConnectionPool, 'https': HTTPSConnectionPool}
+
+    return ResolvingAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+
+def printCacheStats(processor):
+    print("VPOL cache stats:", file=sys.stderr)
+    for label, cache in (("dns", processor.dnsCache), ("results", processor.resultCache)):
+        lookups = cache.hits + cache.misses
+        rate = f"{cache.hits / lookups * 100:.1f}%" if lookups else "-"
+        print(f"  {label:<8} {cache.hits:8} hits {cache.misses:8} misses  hit rate {rate:>6}  {len(cache.entries)} entries", file=sys.stderr)
+
+def encodeNode(value):
+    cls = value.__class__
+    if cls is Instruction:
+        return (NODE_INSTRUCTION, value.op, value.lineNum) + tuple(map(encodeNode, value.args))
+    if cls is Literal:
+        return (NODE_LITERAL, value.value)
+    if cls is Variable:
+        return (NODE_VARIABLE, value.slot)
+    if cls is Concat:
+        return (NODE_CONCAT,) + tuple(map(encodeNode, value.parts))
+    if cls is Comparison:
+        return (NODE_COMPARISON, value.symbol, encodeNode(value.left), encodeNode(value.right))
+    if cls is tuple:
+        return (NODE_TUPLE,) + tuple(map(encodeNode, value))
+    if cls is list:
+        return (NODE_LIST,) + tuple(map(encodeNode, value))
+    if value is None or cls in (str, int, float, bool):
+        return value
+    raise ValueError(f"cannot cache {cls.__name__} values")
+
+def encodeProgram(program):
+    return tuple(program.table.names), tuple(map(encodeNode, program))
+
+def decodeProgram(encoded):
+    names, code = encoded
+    table = SlotTable(names)
+    variables = [Variable(name, slot) for slot, name in enumerate(names)]
+
+    def decode(value):
+        if value.__class__ is not tuple:
+            return value
+        tag = value[0]
+        if tag == NODE_INSTRUCTION:
+            return Instruction(value[1], tuple(map(decode, value[3:])), value[2])
+        if tag == NODE_LITERAL:
+            return Literal(value[1])
+        if tag == NODE_VARIABLE:
+            return variables[value[1]]
+        if tag == NODE_CONCAT:
+            return Concat(list(map(decode, value[1:])))
+        if tag == NODE_COMPARISON:
+            return Comparison(decode(value[2]), value[1], decode(value[3]))
+        if tag == NODE_TUPLE:
+            return tuple(map(decode, value[1:]))
+        return list(map(decode, value[1:]))
+
+    return Program(map(decode, code), table)
+
+class BytecodeCache:
+    def __init__(self, scriptPath):
+        scriptPath = os.path.abspath(scriptPath)
+        self.cacheDir = os.path.join(os.path.dirname(scriptPath), CACHE_DIR_NAME)
+        self.baseName = os.path.splitext(os.path.basename(scriptPath))[0]
+
+    def key(self, code):
+        digest = hashlib.sha256()
+        digest.update(f"{VPOL_VERSION}:{BYTECODE_VERSION}".encode())
+        digest.update(b"\0")
+        digest.update(code.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def pathFor(self, key):
+        return os.path.join(self.cacheDir, f"{self.baseName}.{key[:32]}{CACHE_SUFFIX}")
+
+    def entries(self):
+        if not os.path.isdir(self.cacheDir):
+            return []
+        prefix = self.baseName + "."
+        return [os.path.join(self.cacheDir, name) for name in os.listdir(self.cacheDir)
+                if name.startswith(prefix) and name.endswith(CACHE_SUFFIX)
+                and "." not in name[len(prefix):-len(CACHE_SUFFIX)]]
+
+    def header(self, key):
+        return f"{CACHE_MAGIC} {VPOL_VERSION} {BYTECODE_VERSION} {marshal.version} {key}\n".encode()
+
+    def load(self, code):
+        key = self.key(code)
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.pathFor(key), 'rb') as f:
+                if f.readline() != self.header(key):
+                    return None
+                data = f.read()
+            return decodeProgram(marshal.loads(data))
+        except (OSError, EOFError, ValueError, TypeError, IndexError, KeyError):
+            return None
+        finally:
+            if gcEnabled:
+                gc.enable()
+
+    def store(self, code, instructions):
+        key = self.key(code)
+        path = self.pathFor(key)
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            for stale in self.entries():
+                if stale != path:
+                    os.remove(stale)
+            tmpPath = f"{path}.{os.getpid()}.tmp"
+            data = marshal.dumps(encodeProgram(instructions))
+            with open(tmpPath, 'wb') as f:
+                f.write(self.header(key))
+                f.write(data)
+            os.replace(tmpPath, path)
+        except (OSError, ValueError):
+            pass
+
+    def clear(self):
+        removed = 0
+        for path in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+class LineReader:
+    def __init__(self, lines):
+        self.lines = enumerate(lines, 1)
+        self.pending = []
+
+    def next(self):
+        if self.pending:
+            return self.pending.pop()
+        item = next(self.lines, None)
+        if item is None:
+            return None
+        lineNum, rawLine = item
+        return lineNum, rawLine.rstrip('\r\n')
+
+    def pushBack(self, item):
+        self.pending.append(item)
+
+class BlockReader:
+    def __init__(self, reader, indent):
+        self.reader = reader
+        self.indent = indent
+        self.done = False
+        self.inComment = False
+
+    def next(self):
+        if self.done:
+            return None
+        item = self.reader.next()
+        if item is None:
+            self.done = True
+            return None
+        lineNum, rawLine = item
+        line = rawLine.strip()
+        if self.inComment:
+            self.inComment = not line.endswith("]]")
+            return item
+        if line.startswith('#'):
+            self.inComment = line.startswith("#[[")
+            return item
+        if line and len(rawLine) - len(rawLine.lstrip()) <= self.indent:
+            self.reader.pushBack(item)
+            self.done = True
+            return None
+        return item
+
+    def pushBack(self, item):
+        self.reader.pushBack(item)
+
+def lineIndent(rawLine):
+    return len(rawLine) - len(rawLine.lstrip())
+
+def stripComment(line):
+    if '#' not in line:
+        return line
+    if line[0] == '#':
+        return ''
+    return commentPattern.match(line).group().rstrip()
+
+def statementKeyword(line):
+    if line[0] in '@~$}':
+        return line[0]
+    match = keywordPattern.match(line)
+    if match is None:
+        return line[0]
+    keyword = match.group()
+    if keyword not in STATEMENT_KEYWORDS:
+        for prefix in STATEMENT_PREFIXES:
+            if keyword.startswith(prefix):
+                return prefix
+    return keyword
+
+def patchJump(code, index, target):
+    instruction = code[index]
+    instruction.args = instruction.args[:-1] + (target - index - 1,)
+
+class OpenIf:
+    __slots__ = ('indent', 'code', 'test', 'exits')
+
+    def __init__(self, indent, code, test):
+        self.indent = indent
+        self.code = code
+        self.test = test
+        self.exits = []
+
+    def close(self):
+        end = len(self.code)
+        if self.test is not None:
+            patchJump(self.code, self.test, end)
+        for index in self.exits:
+            patchJump(self.code, index, end)
+
+    def branch(self, instruction):
+        self.exits.append(len(self.code))
+        self.code.append(Instruction('jump', (0,), instruction.lineNum))
+        if self.test is not None:
+            patchJump(self.code, self.test, len(self.code))
+        self.test = len(self.code) if instruction.op == 'elseif' else None
+        if instruction.op != 'else':
+            self.code.append(instruction)
+
 class VPOLProcessor:
     def __init__(self):
-        self.vars = {}
-        self.shouldExecute = None
-        self.lines = []
+        self.useStore(VariableStore())
+        self.functions = {}
+        self.maxConcurrency = DEFAULT_MAX_CONCURRENCY
+        self.httpTimeout = DEFAULT_HTTP_TIMEOUT
+        self.session = None
+        self.sessionLock = threading.Lock()
+        self.capture = threading.local()
+        self.stdout = OutputBuffer(sys.stdout)
+        self.output = self.stdout
+        self.errorOutput = None
+        self.interactive = True
+        self.profiler = None
+        self.dnsTtl = DNS_CACHE_TTL
+        self.scriptTimeout = None
+        self.networkTimeout = None
+        self.maxCallDepth = DEFAULT_MAX_CALL_DEPTH
+        self.maxStatements = None
+        self.maxOutputBytes = None
+        self.deadline = None
+        self.statements = 0
+        self.outputBytes = 0
+        self.budgeted = False
+        self.loop = None
+        self.tasks = set()
+        self.pendingTasks = []
+        self.taskErrors = 0
+        self.inputs = {}
+        self.dnsCache = TtlCache(DNS_CACHE_SIZE)
+        self.resultCache = TtlCache(RESULT_CACHE_SIZE)
+        self.handlers = {
+            'assign': self.assignVar,
+            'declare': self.declareVar,
+            'print': self.printContent,
+            'title': self.setTitle,
+            'cls': self.clearScreen,
+            'flush': self.flushOutput,
+            'json': self.parseJson,
+            'json_get': self.getJson,
+            'json_load': self.loadJson,
+            'ping': self.ping,
+            'http': self.checkHttp,
+            'http_many': self.checkHttpMany,
+            'packet': self.sendPacket,
+            'scan': self.scanPorts,
+            'call': self.callFunction,
+            'input': self.inputVariable,
+            'function': self.defineFunction,
+            'if': self.evaluateIf,
+            'elseif': self.evaluateIf,
+            'jump': self.jump,
+            'repeat': self.repeatBlock,
+            'for': self.forBlock,
+            'for_range': self.forRange,
+            'parallel': self.runParallel,
+            'every': self.scheduleTask,
+            'after': self.scheduleTask,
+            'spawn': self.scheduleTask,
+            'error': self.raiseError,
+        }
+        self.compilers = {
+            'if': self.compileIf,
+            'elseif': self.compileStrayBranch,
+            'else': self.compileStrayBranch,
+            '@': self.compileAssign,
+            'terminal.print': self.compilePrint,
+            'terminal.set_title': self.compileSetTitle,
+            'terminal.flush': self.compileFlush,
+            'terminal.input': self.compileInput,
+            'cls': self.compileClear,
+            'json.parse': self.compileJsonParse,
+            'json.get': self.compileJsonGet,
+            'json.load_file': self.compileJsonLoad,
+            'network.ping': self.compilePing,
+            'network.http_check_many': self.compileHttpCheckMany,
+            'network.http_check': self.compileHttpCheck,
+            'network.scan': self.compileScan,
+            'network.send_packet': self.compileSendPacket,
+            '~': self.compileFunctionCall,
+            'spawn': self.compileSpawn,
+        }
+        self.blockCompilers = {
+            'parallel': self.compileParallel,
+            'repeat': self.compileLoop,
+            'for': self.compileLoop,
+            'every': self.compileSchedule,
+            'after': self.compileSchedule,
+        }
+        self.asyncHandlers = dict.fromkeys(AWAITED_OPS, self.awaitStatement)
+        self.asyncHandlers.update({
+            'call': self.callFunctionAsync,
+            'repeat': self.repeatBlockAsync,
+            'for': self.forBlockAsync,
+            'for_range': self.forRangeAsync,
+        })
+
+    def reset(self):
+        self.useStore(VariableStore())
         self.functions = {}
-        self.in_if_block = False
-        self.if_condition_met = False
+        self.capture = threading.local()
+        self.pendingTasks = []
+
+    def run(self, code, cache=None):
+        try:
+            start = time.perf_counter()
+            instructions = cache.load(code) if cache else None
+            if instructions is None:
+                instructions = self.compile(code)
+                if cache:
+                    cache.store(code, instructions)
+                STARTUP_TIMES["compile"] = time.perf_counter() - start
+            else:
+                STARTUP_TIMES["cache load"] = time.perf_counter() - start
+        except VPOLException as e:
+            self.reportError(e)
+            self.output.flush()
+            return e.exitCode
+        return self.runCompiled(instructions)
+
+    def useStore(self, store):
+        self.vars = store
+        self.values = store.values
+        self.slotTable = store.table
+
+    def bindProgram(self, program):
+        store = VariableStore(SlotTable(program.table.names))
+        for name, value in self.vars.items():
+            store[name] = value
+        self.useStore(store)
+
+    def runCompiled(self, instructions):
+        try:
+            self.bindProgram(instructions)
+            self.startRun()
+            self.execute(instructions)
+            if self.pendingTasks:
+                return self.runScheduler()
+        except VPOLException as e:
+            self.reportError(e)
+            return e.exitCode
+        finally:
+            self.output.flush()
+        return EXIT_OK
+
+    def runStream(self, lines):
+        try:
+            self.startRun()
+            for unit in self.compileUnits(LineReader(lines)):
+                self.execute(unit)
+            if self.pendingTasks:
+                return self.runScheduler()
+        except VPOLException as e:
+            self.reportError(e)
+            return e.exitCode
+        finally:
+            self.output.flush()
+        return EXIT_OK
+
+    def startRun(self):
+        self.statements = 0
+        self.outputBytes = 0
+        self.taskErrors = 0
+        callDepth.set(0)
+        for name, value in self.inputs.items():
+            self.vars[name] = value
+        self.deadline = None if self.scriptTimeout is None else time.perf_counter() + self.scriptTimeout
+        if self.maxCallDepth is not None:
+            sys.setrecursionlimit(max(sys.getrecursionlimit(), self.maxCallDepth * CALL_FRAMES + 100))
+        if not self.budgeted and (self.scriptTimeout is not None or self.networkTimeout is not None or self.maxStatements is not None):
+            self.handlers = {op: self.budgetedHandler(op, handler) for op, handler in self.handlers.items()}
+            self.budgeted = True
+
+    def budgetedHandler(self, op, handler):
+        clock = time.perf_counter
+        network = op in PARALLEL_OPS
+
+        def run(instruction):
+            self.checkBudget()
+            if not network:
+                return handler(instruction)
+            start = clock()
+            result = handler(instruction)
+            if self.networkTimeout is not None and clock() - start >= self.networkTimeout:
+                raise NetworkTimeout(f"Network statement timed out after {self.networkTimeout:g}s")
+            if self.deadline is not None and clock() >= self.deadline:
+                raise ScriptTimeout(f"Script timed out after {self.scriptTimeout:g}s")
+            return result
+        return run
+
+    def checkBudget(self):
+        self.statements += 1
+        if self.maxStatements is not None and self.statements > self.maxStatements:
+            raise StatementLimitExceeded(f"Statement limit of {self.maxStatements} reached")
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise ScriptTimeout(f"Script timed out after {self.scriptTimeout:g}s")
+
+    def networkLimit(self):
+        limit = self.networkTimeout
+        if limit is not None and not limit > 0:
+            raise NetworkTimeout("Network timeout must be greater than 0")
+        if self.deadline is not None:
+            remaining = self.deadline - time.perf_counter()
+            if remaining <= 0:
+                raise ScriptTimeout(f"Script timed out after {self.scriptTimeout:g}s")
+            limit = remaining if limit is None else min(limit, remaining)
+        return limit
+
+    def limitTimeout(self, timeout, limit):
+        if limit is None:
+            return timeout
+        return limit if timeout is None else min(timeout, limit)
+
+    def reportError(self, e):
+        self.output.flush()
+        message = f"VPOL Error: {e.message}" if e.lineNum is None else f"VPOL Error on line {e.lineNum}: {e.message}"
+        if self.errorOutput is None:
+            colorama = loadBackend('colorama')
+            print(f"{colorama.Fore.RED}{message}{colorama.Style.RESET_ALL}", file=sys.stderr)
+        else:
+            self.errorOutput.write(message + "\n")
+
+    def compile(self, code):
+        program = Program()
+        slotTable, self.slotTable = self.slotTable, program.table
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            for unit in self.compileUnits(LineReader(code.split('\n'))):
+                program.extend(unit)
+        finally:
+            self.slotTable = slotTable
+            if gcEnabled:
+                gc.enable()
+        return program
+
+    def compileExpression(self, text):
+        return compileExpression(text, self.slotTable)
 
-    def run(self, code):
-        self.lines = code.split('\n')
+    def compileOptionalExpression(self, text):
+        return None if text is None else compileExpression(text, self.slotTable)
+
+    def compileBlock(self, reader):
+        return [instruction for unit in self.compileUnits(reader) for instruction in unit]
+
+    def compileUnits(self, reader):
         inMultilineComment = False
         isFunctionDefining = False
         currentFunctionName = None
         currentFunctionBody = []
+        functionLineNum = 0
+        openIfs = []
+        unit = []
 
-        lineNum = 0
-        while lineNum < len(self.lines):
-            line = self.lines[lineNum].strip()
-            lineNum += 1
+        while True:
+            if unit and not openIfs and not isFunctionDefining:
+                yield unit
+                unit = []
 
-            try:
-                if inMultilineComment:
-                    if line.strip().endswith("]]"):
-                        inMultilineComment = False
-                    continue
-                if line.strip().startswith("#[["):
+            item = reader.next()
+            if item is None:
+                break
+            lineNum, rawLine = item
+            line = rawLine.strip()
+
+            if inMultilineComment:
+                if line.endswith("]]"):
+                    inMultilineComment = False
+                continue
+            if not line:
+                continue
+            if line[0] == '#':
+                if line.startswith("#[["):
                     inMultilineComment = True
-                    continue
+                continue
+            if '#' in line:
+                line = stripComment(line)
 
-                if line.startswith("${"):
-                    currentFunctionName = line[2:].strip()
-                    isFunctionDefining = True
-                    currentFunctionBody = []
-                    continue
+            indent = len(rawLine) - len(rawLine.lstrip())
+            keyword = statementKeyword(line)
+            isBranch = keyword == 'elseif' or keyword == 'else'
+            while openIfs and (openIfs[-1].indent > indent or (openIfs[-1].indent == indent and not isBranch)):
+                openIfs.pop().close()
+            code = currentFunctionBody if isFunctionDefining else unit
 
-                elif line.strip() == "}" and isFunctionDefining:
-                    self.functions[currentFunctionName] = currentFunctionBody
-                    isFunctionDefining = False
+            if isBranch and openIfs and openIfs[-1].indent == indent and openIfs[-1].test is not None:
+                try:
+                    instruction = self.compileElseIf(line, lineNum) if keyword == 'elseif' else self.compileElse(line, lineNum)
+                except VPOLException as e:
+                    openIfs[-1].branch(Instruction('else', (), lineNum))
+                    openIfs[-1].code.append(Instruction('error', (e.message,), lineNum))
                     continue
+                openIfs[-1].branch(instruction)
+                continue
 
-                elif isFunctionDefining:
-                    currentFunctionBody.append(line)
-                    continue
+            if keyword == '$' and line.startswith("${"):
+                currentFunctionName = line[2:].strip()
+                isFunctionDefining = True
+                currentFunctionBody = []
+                functionLineNum = lineNum
+                continue
+            elif keyword == '}' and line == "}" and isFunctionDefining:
+                isFunctionDefining = False
+                unit.append(Instruction('function', (currentFunctionName, currentFunctionBody), functionLineNum))
+                continue
 
-                else:
-                    self.processLine(line, lineNum)
+            blockCompiler = self.blockCompilers.get(keyword)
+            if blockCompiler is not None:
+                instruction = blockCompiler(line, lineNum, rawLine, reader)
+            else:
+                instruction = self.compileStatement(line, lineNum, keyword)
+            if instruction is not None:
+                code.append(instruction)
+                if instruction.op == 'if':
+                    openIfs.append(OpenIf(indent, code, len(code) - 1))
 
-            except VPOLException as e:
-                print(f"{Fore.RED}VPOL Error on line {lineNum}: {e.message}{Style.RESET_ALL}")
-                return
+        while openIfs:
+            openIfs.pop().close()
+        if unit:
+            yield unit
 
-    def processLine(self, line, lineNum):
+    def compileLine(self, line, lineNum):
+        line = stripComment(line)
         if not line:
-            return
+            return None
+        return self.compileStatement(line, lineNum, statementKeyword(line))
 
-        if line.startswith('if'):
-            self.evaluateIf(line, lineNum)
-            return
-        elif line.startswith('elseif'):
-            self.evaluateElseIf(line, lineNum)
-            return
-        elif line.startswith('else:'):
-            self.evaluateElse()
-            return
+    def compileStatement(self, line, lineNum, keyword):
+        compiler = self.compilers.get(keyword)
+        if compiler is None:
+            return None
+        try:
+            return compiler(line, lineNum)
+        except VPOLException as e:
+            return Instruction('error', (e.message,), lineNum)
+
+    def compileStrayBranch(self, line, lineNum):
+        raise VPOLException(f"{statementKeyword(line)} without if")
 
-        if not self.in_if_block or (self.in_if_block and self.shouldExecute):
-            if line.startswith('@'):
-                self.assignVar(line, lineNum)
-            elif line.startswith('terminal.print'):
-                self.printContent(line, lineNum)
-            elif line.startswith('terminal.set_title'):
-                self.setTitle(line, lineNum)
-            elif line.startswith('cls()'):
-                os.system('cls' if os.name == 'nt' else 'clear')
-            elif line.startswith('json.parse'):
-                self.parseJson(line, lineNum)
-            elif line.startswith('network.ping'):
-                self.ping(line, lineNum)
-            elif line.startswith('network.http_check'):
-                self.checkHttp(line, lineNum)
-            elif line.startswith('network.send_packet'):
-                self.sendPacket(line, lineNum)
-            elif line.startswith('~$'):
-                self.callFunction(line, lineNum)
-            elif line.startswith('terminal.input'):
-                self.inputVariable(line, lineNum)
-
-    def callFunction(self, line, lineNum):
-        match = re.search(r'~\$(\w+)', line)
+    def compilePrint(self, line, lineNum):
+        match = printPattern.fullmatch(line)
         if not match:
-            raise VPOLException("Invalid function call")
-        
-        functionName = match.group(1)
-        if functionName not in self.functions:
-            raise VPOLException(f"Function '{functionName}' not defined")
-        
-        for functionLine in self.functions[functionName]:
-            self.processLine(functionLine, lineNum)
+            raise VPOLException("Invalid print statement")
+        return Instruction('print', (compileExpression(match.group(1), self.slotTable),), lineNum)
+
+    def compileSetTitle(self, line, lineNum):
+        return self.compileCall(line, lineNum, 'title', titlePattern, "Invalid set_title statement", expression=False)
+
+    def compileFlush(self, line, lineNum):
+        if not re.fullmatch(r'terminal\.flush\(\s*\)', line):
+            raise VPOLException("Invalid flush statement")
+        return Instruction('flush', (), lineNum)
+
+    def compileClear(self, line, lineNum):
+        if not re.fullmatch(r'cls\(\s*\)', line):
+            raise VPOLException("Invalid cls statement")
+        return Instruction('cls', (), lineNum)
+
+    def compileParallel(self, line, lineNum, rawLine, reader):
+        body = self.compileBlock(BlockReader(reader, lineIndent(rawLine)))
+        error = None
+
+        match = re.fullmatch(r'parallel(?:\s+(\d+))?\s*:', line)
+        if not match or (match.group(1) and int(match.group(1)) < 1):
+            error = Instruction('error', ("Invalid parallel block",), lineNum)
+
+        for instruction in body:
+            if instruction.op not in PARALLEL_OPS and instruction.op != 'error' and error is None:
+                error = Instruction('error', ("Only network statements can run inside a parallel block",), instruction.lineNum)
 
-    def evaluateIf(self, line, lineNum):
-        match = re.search(r'if (.+):', line)
+        if error is not None:
+            return error
+        limit = int(match.group(1)) if match.group(1) else None
+        return Instruction('parallel', (limit, body), lineNum)
+
+    def compileLoop(self, line, lineNum, rawLine, reader):
+        body = self.compileBlock(BlockReader(reader, lineIndent(rawLine)))
+        try:
+            if line.startswith('repeat'):
+                match = re.fullmatch(r'repeat\s+(.+?)\s*:', line)
+                if not match:
+                    raise VPOLException("Invalid repeat statement")
+                return Instruction('repeat', (self.compileExpression(match.group(1)), body), lineNum)
+
+            match = re.fullmatch(r'for\s+@(\w+)\s+in\s+(.+?)\s*:', line)
+            if not match:
+                raise VPOLException("Invalid for statement: expected for @var in <list or range(...)>:")
+            varName, source = match.groups()
+            rangeMatch = re.fullmatch(r'range\((.*)\)', source)
+            if rangeMatch:
+                bounds = splitArgs(rangeMatch.group(1))
+                if not 1 <= len(bounds) <= 3:
+                    raise VPOLException("range() takes one to three arguments")
+                return Instruction('for_range', (self.slotTable.variable(varName), tuple(self.compileExpression(bound) for bound in bounds), body), lineNum)
+            return Instruction('for', (self.slotTable.variable(varName), self.compileExpression(source), body), lineNum)
+        except VPOLException as e:
+            return Instruction('error', (e.message,), lineNum)
+
+    def compileSchedule(self, line, lineNum, rawLine, reader):
+        match = re.fullmatch(r'(every|after)\s+(.+?)\s*:\s*(.*)', line)
+        if match and match.group(3):
+            instruction = self.compileLine(match.group(3), lineNum)
+            body = [] if instruction is None else [instruction]
+        else:
+            body = self.compileBlock(BlockReader(reader, lineIndent(rawLine)))
+        try:
+            if not match:
+                raise VPOLException("Invalid schedule statement: expected every <interval>: or after <delay>:")
+            return Instruction(match.group(1), (compileDuration(match.group(2), self.slotTable), body), lineNum)
+        except VPOLException as e:
+            return Instruction('error', (e.message,), lineNum)
+
+    def compileSpawn(self, line, lineNum):
+        match = re.fullmatch(r'spawn\s+(.+)', line)
+        if not match:
+            raise VPOLException("Invalid spawn statement: expected spawn ~$function")
+        instruction = self.compileLine(match.group(1), lineNum)
+        if instruction is None:
+            raise VPOLException("spawn needs a statement to run")
+        return Instruction('spawn', (None, [instruction]), lineNum)
+
+    def compileCall(self, line, lineNum, op, pattern, errorMessage, expression=True):
+        match = pattern.fullmatch(line)
+        if not match:
+            raise VPOLException(errorMessage)
+        operand = match.group(1).strip()
+        return Instruction(op, (self.compileExpression(operand) if expression else operand,), lineNum)
+
+    def compileCondition(self, condition):
+        left, symbol, right = splitCondition(condition)
+        if not left.strip() or not right.strip():
+            raise VPOLException("Invalid condition: both sides of a comparison are required")
+        return Comparison(self.compileExpression(left), symbol, self.compileExpression(right))
+
+    def compilePing(self, line, lineNum):
+        match = re.search(r'network\.ping\((.*)\)\s*(?:@(\w+))?\s*$', line)
+        if not match:
+            raise VPOLException("Invalid ping statement")
+        positional, options = parseCallArgs(match.group(1))
+        if not positional:
+            raise VPOLException("ping requires at least one host")
+        for name in options:
+            if name not in PING_OPTIONS:
+                raise VPOLException(f"Unknown ping option '{name}'")
+        return Instruction('ping', (tuple(map(self.compileExpression, positional)), match.group(2)) + tuple(self.compileOptionalExpression(options.get(name)) for name in PING_OPTIONS), lineNum)
+
+    def compileJsonParse(self, line, lineNum):
+        match = re.search(r'json\.parse\((.*)\)\s*(?:@(\w+))?\s*$', line)
+        if not match:
+            raise VPOLException("Invalid JSON parse statement")
+        return Instruction('json', (self.compileExpression(match.group(1)), match.group(2)), lineNum)
+
+    def compileJsonGet(self, line, lineNum):
+        match = re.search(r'json\.get\((.*)\)\s*@(\w+)\s*$', line)
+        if not match:
+            raise VPOLException("Invalid json.get statement: expected json.get(@doc, \"path\") @result")
+        positional, options = parseCallArgs(match.group(1))
+        if len(positional) != 2 or set(options) - {'default'}:
+            raise VPOLException("json.get requires a document and a path")
+        path = self.compileExpression(positional[1])
+        if isinstance(path, Literal):
+            path = (formatValue(path.value), parseJsonPath(formatValue(path.value)))
+        return Instruction('json_get', (self.compileExpression(positional[0]), path, match.group(2), self.compileOptionalExpression(options.get('default'))), lineNum)
+
+    def compileJsonLoad(self, line, lineNum):
+        match = re.search(r'json\.load_file\((.*)\)\s*@(\w+)\s*$', line)
+        if not match:
+            raise VPOLException("Invalid json.load_file statement: expected json.load_file(\"path\") @result")
+        positional, options = parseCallArgs(match.group(1))
+        if len(positional) != 1 or set(options) - {'format'}:
+            raise VPOLException("json.load_file requires a file path")
+        return Instruction('json_load', (self.compileExpression(positional[0]), match.group(2), self.compileOptionalExpression(options.get('format'))), lineNum)
+
+    def compileHttpOptions(self, options):
+        for name in options:
+            if name not in HTTP_OPTIONS:
+                raise VPOLException(f"Unknown http_check option '{name}'")
+        return tuple(self.compileOptionalExpression(options.get(name)) for name in HTTP_OPTIONS)
+
+    def compileHttpCheck(self, line, lineNum):
+        match = re.fullmatch(r'network\.http_check\((.*)\)', line)
+        if not match:
+            raise VPOLException("Invalid http_check statement")
+        positional, options = parseCallArgs(match.group(1))
+        if len(positional) != 1:
+            raise VPOLException("http_check requires a URL")
+        return Instruction('http', (self.compileExpression(positional[0]),) + self.compileHttpOptions(options), lineNum)
+
+    def compileHttpCheckMany(self, line, lineNum):
+        match = re.search(r'network\.http_check_many\((.*)\)\s*@(\w+)\s*$', line)
+        if not match:
+            raise VPOLException("Invalid http_check_many statement: expected network.http_check_many(urls...) @result")
+        positional, options = parseCallArgs(match.group(1))
+        if not positional:
+            raise VPOLException("http_check_many requires at least one URL")
+        return Instruction('http_many', (tuple(map(self.compileExpression, positional)), match.group(2)) + self.compileHttpOptions(options), lineNum)
+
+    def compileIf(self, line, lineNum):
+        match = re.fullmatch(r'if\s+(.+):', line)
         if not match:
             raise VPOLException("Invalid if statement")
-        
-        condition = match.group(1).strip()
-        self.in_if_block = True
-        self.shouldExecute = self.evaluateCondition(condition, lineNum)
-        self.if_condition_met = self.shouldExecute
-
-    def evaluateElseIf(self, line, lineNum):
-        if not self.in_if_block:
-            raise VPOLException("elseif without if")
-            
-        match = re.search(r'elseif (.+):', line)
+        return Instruction('if', (self.compileCondition(match.group(1).strip()), 0), lineNum)
+
+    def compileElse(self, line, lineNum):
+        if not re.fullmatch(r'else\s*:', line):
+            raise VPOLException("Invalid else statement")
+        return Instruction('else', (), lineNum)
+
+    def compileElseIf(self, line, lineNum):
+        match = re.fullmatch(r'elseif\s+(.+):', line)
         if not match:
             raise VPOLException("Invalid elseif statement")
-        
-        if not self.if_condition_met:
-            condition = match.group(1).strip()
-            self.shouldExecute = self.evaluateCondition(condition, lineNum)
-            if self.shouldExecute:
-                self.if_condition_met = True
-        else:
-            self.shouldExecute = False
-
-    def evaluateElse(self):
-        if not self.in_if_block:
-            raise VPOLException("else without if")
-        
-        self.shouldExecute = not self.if_condition_met
-
-    def evaluateCondition(self, condition, lineNum):
-        if "=" in condition:
-            left, right = map(str.strip, condition.split("="))
-            left_value = self.evaluate(left, lineNum)
-            right_value = self.evaluate(right, lineNum)
-            return str(left_value) == str(right_value)
-        raise VPOLException("Invalid if statement: only '=' comparisons are supported.")
-
-    def inputVariable(self, line, lineNum):
-        match = re.search(r'terminal\.input\("(.*)"\)\s*([@]\w+)', line)
-        if not match:
-            raise VPOLException("Invalid input statement")
+        return Instruction('elseif', (self.compileCondition(match.group(1).strip()), 0), lineNum)
 
-        prompt = match.group(1)
-        varName = match.group(2)[1:]
-        
-        value = input(prompt)
-        self.vars[varName] = value
+    def compileAssign(self, line, lineNum):
+        if line.endswith("{"):
+            return Instruction('declare', (line.split('=')[0].strip()[1:],), lineNum)
 
-    def assignVar(self, line, lineNum):
-        if line.strip().endswith("{"):
-            varName = line.split('=')[0].strip()[1:]
-            self.vars[varName] = ""
-            return
-        
         try:
             varName, value = line.split('=', 1)
         except ValueError:
             raise VPOLException("Invalid variable assignment")
-        
-        varName = varName.strip()[1:]
-        value = self.evaluate(value.strip(), lineNum)
-        self.vars[varName] = value
+        target = varName.strip()[1:]
+        return Instruction('assign', (self.slotTable.variable(target), self.compileExpression(value)), lineNum)
 
-    def printContent(self, line, lineNum):
-        match = re.search(r'terminal\.print\((.*)\)', line)
+    def compileSendPacket(self, line, lineNum):
+        match = re.search(r'network\.send_packet\((.*)\)\s*(?:@(\w+))?\s*$', line)
         if not match:
-            raise VPOLException("Invalid print statement")
-        
-        content = match.group(1)
-        result = self.evaluate(content.strip(), lineNum)
-        print(result)
+            raise VPOLException("Invalid send_packet statement")
+        positional, options = parseCallArgs(match.group(1))
+        for name in options:
+            if name not in PACKET_OPTIONS:
+                raise VPOLException(f"Unknown send_packet option '{name}'")
+        return Instruction('packet', (tuple(map(self.compileExpression, positional)), match.group(2)) + tuple(self.compileOptionalExpression(options.get(name)) for name in PACKET_OPTIONS), lineNum)
 
-    def setTitle(self, line, lineNum):
-        match = re.search(r'terminal\.set_title\((.*)\)', line)
+    def compileScan(self, line, lineNum):
+        match = re.search(r'network\.scan\((.*)\)\s*(?:@(\w+))?\s*$', line)
         if not match:
-            raise VPOLException("Invalid set_title statement")
-        
-        title = match.group(1).strip().strip('"')
-        TerminalUtils.setTitle(title)
+            raise VPOLException("Invalid scan statement: expected network.scan(hosts, ports, tcp|udp) @result")
+        positional, options = parseCallArgs(match.group(1))
+        if len(positional) not in (2, 3):
+            raise VPOLException("scan requires hosts, ports and an optional protocol")
+        for name in options:
+            if name not in SCAN_OPTIONS:
+                raise VPOLException(f"Unknown scan option '{name}'")
+        protocol = self.compileExpression(positional[2]) if len(positional) == 3 else Literal('tcp')
+        return Instruction('scan', (self.compileExpression(positional[0]), self.compileExpression(positional[1]), protocol, match.group(2)) + tuple(self.compileOptionalExpression(options.get(name)) for name in SCAN_OPTIONS), lineNum)
 
-    def parseJson(self, line, lineNum):
-        match = re.search(r'json\.parse\((.*)\ )', line)
+    def compileFunctionCall(self, line, lineNum):
+        match = re.fullmatch(r'~\$(\w+)', line)
         if not match:
-            raise VPOLException("Invalid JSON parse statement")
-        
-        content = match.group(1)
-        content = self.evaluate(content.strip(), lineNum)
+            raise VPOLException("Invalid function call")
+        return Instruction('call', (match.group(1),), lineNum)
+
+    def compileInput(self, line, lineNum):
+        match = re.fullmatch(r'terminal\.input\("(.*)"\)\s*@(\w+)', line)
+        if not match:
+            raise VPOLException("Invalid input statement")
+        return Instruction('input', (match.group(1), match.group(2)), lineNum)
+
+    def execute(self, instructions):
+        handlers = self.handlers
+        instruction = None
+        position = 0
+        count = len(instructions)
+        try:
+            while position < count:
+                instruction = instructions[position]
+                position += 1
+                skip = handlers[instruction.op](instruction)
+                if skip:
+                    position += skip
+        except VPOLException as e:
+            if e.lineNum is None and instruction is not None:
+                e.lineNum = instruction.lineNum
+            raise
+
+    def enableProfiling(self, profiler):
+        self.profiler = profiler
+        self.execute = self.executeProfiled
+
+    def executeProfiled(self, instructions):
+        handlers = self.handlers
+        profiler = self.profiler
+        clock = time.perf_counter
+        instruction = None
+        position = 0
+        count = len(instructions)
+        try:
+            while position < count:
+                instruction = instructions[position]
+                position += 1
+                profiler.enter()
+                start = clock()
+                try:
+                    skip = handlers[instruction.op](instruction)
+                finally:
+                    profiler.leave(instruction, start, clock())
+                if skip:
+                    position += skip
+        except VPOLException as e:
+            if e.lineNum is None and instruction is not None:
+                e.lineNum = instruction.lineNum
+            raise
+
+    def processLine(self, line, lineNum):
+        instruction = self.compileLine(line.strip(), lineNum)
+        if instruction is not None:
+            self.execute([instruction])
+
+    def emit(self, text):
+        buffer = getattr(self.capture, 'buffer', None)
+        if buffer is None:
+            if self.maxOutputBytes is not None:
+                self.outputBytes += len(text.encode('utf-8', 'replace')) + 1
+                if self.outputBytes > self.maxOutputBytes:
+                    raise OutputLimitExceeded(f"Output limit of {self.maxOutputBytes} bytes reached")
+            self.output.write(f"{text}\n")
+        else:
+            buffer.append(text)
+
+    def runCaptured(self, instruction):
+        self.capture.buffer = []
+        try:
+            self.execute([instruction])
+            return self.capture.buffer, None
+        except VPOLException as e:
+            return self.capture.buffer, e
+        finally:
+            self.capture.buffer = None
+
+    def runParallel(self, instruction):
+        limit, body = instruction.args
+        if not body:
+            return
+        workers = min(limit or self.maxConcurrency, len(body))
+        error = None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.runCaptured, inner) for inner in body]
+            for future in futures:
+                output, exception = future.result()
+                for text in output:
+                    self.emit(text)
+                if exception is not None and error is None:
+                    error = exception
+        if error is not None:
+            raise error
+
+    def raiseError(self, instruction):
+        raise VPOLException(instruction.args[0])
+
+    def defineFunction(self, instruction):
+        functionName, body = instruction.args
+        self.functions[functionName] = body
+
+    def functionBody(self, functionName, depth):
+        if functionName not in self.functions:
+            raise VPOLException(f"Function '{functionName}' not defined")
+        if self.maxCallDepth is not None and depth >= self.maxCallDepth:
+            raise CallDepthExceeded(f"Call depth limit of {self.maxCallDepth} reached calling '{functionName}'")
+        return self.functions[functionName]
+
+    def callFunction(self, instruction):
+        functionName = instruction.args[0]
+        depth = callDepth.get()
+        body = self.functionBody(functionName, depth)
+        callDepth.set(depth + 1)
+        try:
+            self.execute(body)
+        except RecursionError:
+            raise CallDepthExceeded(f"Call stack exhausted calling '{functionName}' at depth {depth + 1}")
+        finally:
+            callDepth.set(depth)
+
+    def evaluateIf(self, instruction):
+        condition, skip = instruction.args
+        if not condition.evaluate(self):
+            return skip
+
+    def jump(self, instruction):
+        return instruction.args[0]
+
+    def repeatBlock(self, instruction):
+        countExpr, body = instruction.args
+        count = self.numberOption(countExpr, 0, "repeat count", instruction.lineNum, convert=int)
+        for _ in range(count):
+            self.execute(body)
+
+    def loopItems(self, value):
+        if isinstance(value, (list, JsonStream)):
+            return value
+        if isinstance(value, dict):
+            return list(value)
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(',') if item.strip()]
+        raise VPOLException("for can only iterate over lists, objects, strings and range()")
+
+    def forBlock(self, instruction):
+        target, sourceExpr, body = instruction.args
+        assign = self.vars.assign
+        for item in self.loopItems(sourceExpr.evaluate(self)):
+            assign(target.slot, item)
+            self.execute(body)
+
+    def forRange(self, instruction):
+        target, boundExprs, body = instruction.args
+        bounds = [self.numberOption(expr, 0, "range bound", instruction.lineNum, convert=int, minimum=float('-inf')) for expr in boundExprs]
+        if len(bounds) == 3 and bounds[2] == 0:
+            raise VPOLException("range() step must not be zero")
+        assign = self.vars.assign
+        for index in range(*bounds):
+            assign(target.slot, index)
+            self.execute(body)
+
+    def scheduleTask(self, instruction):
+        delayExpr, body = instruction.args
+        seconds = self.numberOption(delayExpr, 0, f"{instruction.op} interval", instruction.lineNum)
+        if instruction.op == 'every' and seconds <= 0:
+            raise VPOLException("every interval must be greater than zero")
+        task = (instruction.op, seconds, body)
+        if self.loop is None:
+            self.pendingTasks.append(task)
+        else:
+            self.loop.call_soon_threadsafe(self.startTask, task)
+
+    def runScheduler(self):
+        asyncio = loadBackend('asyncio')
+        try:
+            asyncio.run(self.schedulerLoop())
+        except KeyboardInterrupt:
+            pass
+        return EXIT_ERROR if self.taskErrors else EXIT_OK
+
+    async def schedulerLoop(self):
+        asyncio = loadBackend('asyncio')
+        self.loop = asyncio.get_running_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=self.maxConcurrency))
+        tasks, self.pendingTasks = self.pendingTasks, []
+        try:
+            for task in tasks:
+                self.startTask(task)
+            while self.tasks:
+                timeout = None if self.deadline is None else max(0, self.deadline - time.perf_counter())
+                done, _ = await asyncio.wait(set(self.tasks), timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+                if not done:
+                    raise ScriptTimeout(f"Script timed out after {self.scriptTimeout:g}s")
+                for future in done:
+                    if not future.cancelled() and future.exception() is not None:
+                        raise future.exception()
+        finally:
+            running = list(self.tasks)
+            for future in running:
+                future.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            self.loop = None
+
+    def startTask(self, task):
+        future = self.loop.create_task(self.runTask(*task))
+        self.tasks.add(future)
+        future.add_done_callback(self.tasks.discard)
+
+    async def runTask(self, op, seconds, body):
+        asyncio = loadBackend('asyncio')
+        callDepth.set(0)
+        if op != 'every':
+            await asyncio.sleep(seconds)
+            await self.runTaskBody(body)
+            return
+        start = self.loop.time()
+        while True:
+            await self.runTaskBody(body)
+            await asyncio.sleep(seconds - (self.loop.time() - start) % seconds)
+
+    async def runTaskBody(self, body):
+        try:
+            await self.executeAsync(body)
+        except VPOLException as e:
+            if e.exitCode != EXIT_ERROR:
+                raise
+            self.taskErrors += 1
+            self.reportError(e)
+        finally:
+            self.output.flush()
+
+    async def executeAsync(self, instructions):
+        handlers = self.handlers
+        asyncHandlers = self.asyncHandlers
+        instruction = None
+        position = 0
+        count = len(instructions)
+        try:
+            while position < count:
+                instruction = instructions[position]
+                position += 1
+                handler = asyncHandlers.get(instruction.op)
+                if handler is None:
+                    skip = handlers[instruction.op](instruction)
+                    if skip:
+                        position += skip
+                else:
+                    await handler(instruction)
+        except VPOLException as e:
+            if e.lineNum is None and instruction is not None:
+                e.lineNum = instruction.lineNum
+            raise
+
+    async def awaitStatement(self, instruction):
+        asyncio = loadBackend('asyncio')
+        output, error = await asyncio.to_thread(self.runCaptured, instruction)
+        for text in output:
+            self.emit(text)
+        if error is not None:
+            raise error
+
+    async def callFunctionAsync(self, instruction):
+        if self.budgeted:
+            self.checkBudget()
+        functionName = instruction.args[0]
+        depth = callDepth.get()
+        body = self.functionBody(functionName, depth)
+        callDepth.set(depth + 1)
+        try:
+            await self.executeAsync(body)
+        finally:
+            callDepth.set(depth)
+
+    async def repeatBlockAsync(self, instruction):
+        if self.budgeted:
+            self.checkBudget()
+        countExpr, body = instruction.args
+        for _ in range(self.numberOption(countExpr, 0, "repeat count", instruction.lineNum, convert=int)):
+            await self.executeAsync(body)
+
+    async def forBlockAsync(self, instruction):
+        if self.budgeted:
+            self.checkBudget()
+        target, sourceExpr, body = instruction.args
+        for item in self.loopItems(sourceExpr.evaluate(self)):
+            self.vars.assign(target.slot, item)
+            await self.executeAsync(body)
+
+    async def forRangeAsync(self, instruction):
+        if self.budgeted:
+            self.checkBudget()
+        target, boundExprs, body = instruction.args
+        bounds = [self.numberOption(expr, 0, "range bound", instruction.lineNum, convert=int, minimum=float('-inf')) for expr in boundExprs]
+        if len(bounds) == 3 and bounds[2] == 0:
+            raise VPOLException("range() step must not be zero")
+        for index in range(*bounds):
+            self.vars.assign(target.slot, index)
+            await self.executeAsync(body)
+
+    def inputVariable(self, instruction):
+        prompt, varName = instruction.args
+        if varName in self.inputs:
+            self.vars[varName] = self.inputs[varName]
+            return
+        if not self.interactive:
+            raise VPOLException(f"terminal.input has no value for @{varName}: supply it with --var {varName}=VALUE")
+        self.output.flush()
+        try:
+            value = input(prompt)
+        except EOFError:
+            raise VPOLException(f"terminal.input reached the end of input for @{varName}")
+        self.vars[varName] = value
+
+    def declareVar(self, instruction):
+        self.vars[instruction.args[0]] = ""
+
+    def assignVar(self, instruction):
+        target, value = instruction.args
+        value = value.evaluate(self)
+        values = self.values
+        if target.slot < len(values):
+            values[target.slot] = value
+        else:
+            self.vars.assign(target.slot, value)
+
+    def printContent(self, instruction):
+        result = instruction.args[0].evaluate(self)
+        self.emit(formatValue(result))
+
+    def setTitle(self, instruction):
+        title = instruction.args[0].strip('"')
+        self.output.flush()
+        TerminalUtils.setTitle(title)
+
+    def flushOutput(self, instruction):
+        self.output.flush()
+
+    def clearScreen(self, instruction):
+        self.output.flush()
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+    def parseJson(self, instruction):
+        contentExpr, varName = instruction.args
+        content = contentExpr.evaluate(self)
         try:
             parsedJson = json.loads(content)
-            return json.dumps(parsedJson, indent=4)
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, TypeError):
             raise VPOLException("Invalid JSON format")
+        if varName is not None:
+            self.vars[varName] = parsedJson
 
-    def ping(self, line, lineNum):
-        match = re.search(r'network\.ping\((.*)\)', line)
-        if not match:
-            raise VPOLException("Invalid ping statement")
-        
-        ipAddress = self.evaluate(match.group(1), lineNum)
+    def getJson(self, instruction):
+        docExpr, path, varName, defaultExpr = instruction.args
+        document = docExpr.evaluate(self)
+        if isinstance(document, str):
+            try:
+                document = json.loads(document)
+            except json.JSONDecodeError:
+                raise VPOLException("Invalid JSON format")
+        if isinstance(path, tuple):
+            pathText, steps = path
+        else:
+            pathText = formatValue(path.evaluate(self))
+            steps = parseJsonPath(pathText)
         try:
-            if os.name == 'nt':
-                output = subprocess.run(['ping', '-n', '4', ipAddress], capture_output=True, text=True)
-            else:
-                output = subprocess.run(['ping', '-c', '4', ipAddress], capture_output=True, text=True)
-            print(output.stdout)
-        except subprocess.CalledProcessError:
-            raise VPOLException(f"Failed to ping {ipAddress}")
+            self.vars[varName] = queryJson(document, steps, pathText)
+        except VPOLException:
+            if defaultExpr is None:
+                raise
+            self.vars[varName] = defaultExpr.evaluate(self)
 
-    def checkHttp(self, line, lineNum):
-        match = re.search(r'network\.http_check\((.*)\)', line)
-        if not match:
-            raise VPOLException("Invalid http_check statement")
-        
-        url = self.evaluate(match.group(1), lineNum)
+    def loadJson(self, instruction):
+        pathExpr, varName, formatExpr = instruction.args
+        format = 'auto' if formatExpr is None else formatValue(formatExpr.evaluate(self)).lower()
+        self.vars[varName] = loadJsonFile(formatValue(pathExpr.evaluate(self)), format)
+
+    def numberOption(self, expr, default, name, lineNum, convert=float, minimum=0, positive=False):
+        if expr is None:
+            return default
+        value = expr.evaluate(self)
         try:
-            response = requests.get(url, timeout=5)
-            print(f"Successfully connected to {url}. Status code: {response.status_code}")
+            value = convert(value if value.__class__ is int else formatValue(value))
+        except ValueError:
+            raise VPOLException(f"{name} must be a number")
+        if positive and not value > 0:
+            raise VPOLException(f"{name} must be greater than 0")
+        if value < minimum:
+            raise VPOLException(f"{name} must be at least {minimum}")
+        return value
+
+    def storeRecords(self, varName, records, fields):
+        self.vars[varName] = records
+        self.vars[f"{varName}_count"] = len(records)
+        for index, record in enumerate(records, 1):
+            for suffix, field in fields.items():
+                self.vars[f"{varName}_{index}_{suffix}"] = "" if record[field] is None else record[field]
+
+    def resolveHosts(self, hostExprs, lineNum):
+        hosts = []
+        for hostExpr in hostExprs:
+            value = hostExpr.evaluate(self)
+            items = value if isinstance(value, list) else str(value).split(',')
+            for item in items:
+                item = str(item).strip()
+                if not item:
+                    continue
+                if '/' in item:
+                    try:
+                        network = ipaddress.ip_network(item, strict=False)
+                    except ValueError:
+                        raise VPOLException(f"Invalid network '{item}'")
+                    addresses = [str(address) for address in network.hosts()] or [str(network.network_address)]
+                    hosts.extend((address, address) for address in addresses)
+                else:
+                    hosts.append((item, self.resolveHost(item)))
+        return hosts
+
+    def resolveHost(self, host):
+        found, address = self.dnsCache.get(host)
+        if not found:
+            try:
+                address = socket.gethostbyname(host)
+            except OSError:
+                address = None
+            self.dnsCache.put(host, address, self.dnsTtl if address else min(self.dnsTtl, DNS_NEGATIVE_TTL))
+        return address
+
+    def ping(self, instruction):
+        hostExprs, varName, countExpr, intervalExpr, timeoutExpr, cacheExpr = instruction.args
+        lineNum = instruction.lineNum
+        count = self.numberOption(countExpr, DEFAULT_PING_COUNT, "ping count", lineNum, int, 1)
+        interval = self.numberOption(intervalExpr, DEFAULT_PING_INTERVAL, "ping interval", lineNum)
+        timeout = self.numberOption(timeoutExpr, DEFAULT_PING_TIMEOUT, "ping timeout", lineNum)
+        cacheTtl = self.numberOption(cacheExpr, 0, "ping cache", lineNum)
+
+        hosts = self.resolveHosts(hostExprs, lineNum)
+        addresses = list(dict.fromkeys(address for _, address in hosts if address))
+
+        rtts = {}
+        if cacheTtl:
+            pending = []
+            for address in addresses:
+                found, result = self.resultCache.get(('ping', address, count, interval, timeout))
+                if found:
+                    rtts[address] = result
+                else:
+                    pending.append(address)
+            addresses = pending
+
+        if addresses:
+            limit = self.networkLimit()
+            engine = PingEngine()
+            try:
+                if engine.available():
+                    measured = engine.ping(addresses, count, interval, timeout, limit)
+                else:
+                    measured = {}
+                    with ThreadPoolExecutor(max_workers=min(self.maxConcurrency, len(addresses))) as pool:
+                        for address, result in zip(addresses, pool.map(lambda address: pingBinary(address, count, interval, timeout, limit), addresses)):
+                            measured[address] = result
+            finally:
+                engine.close()
+            rtts.update(measured)
+            if cacheTtl:
+                for address in addresses:
+                    self.resultCache.put(('ping', address, count, interval, timeout), measured.get(address, []), cacheTtl)
+
+        results = [pingStats(host, address, count, rtts.get(address, [])) for host, address in hosts]
+
+        if varName is None:
+            for stats in results:
+                if stats["address"] is None:
+                    self.emit(f"Failed to ping {stats['host']}: host could not be resolved")
+                elif stats["received"]:
+                    self.emit(f"Ping {stats['host']} ({stats['address']}): {stats['sent']} sent, {stats['received']} received, {stats['loss']}% loss, rtt min/avg/max = {stats['min']}/{stats['avg']}/{stats['max']} ms")
+                else:
+                    self.emit(f"Ping {stats['host']} ({stats['address']}): {stats['sent']} sent, 0 received, 100.0% loss")
+        elif len(results) == 1:
+            stats = results[0]
+            self.vars[varName] = stats
+            for field in ("received", "loss", "min", "avg", "max"):
+                self.vars[f"{varName}_{field}"] = "" if stats[field] is None else stats[field]
+        else:
+            self.storeRecords(varName, results, {field: field for field in ("host", "received", "loss", "min", "avg", "max")})
+            self.vars[f"{varName}_alive"] = ",".join(stats["host"] for stats in results if stats["received"])
+
+    def httpSession(self):
+        if self.session is None:
+            with self.sessionLock:
+                if self.session is None:
+                    requests = loadBackend('requests')
+                    session = requests.Session()
+                    adapter = cachedResolverAdapter(requests, self.resolveHost, self.maxConcurrency)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self.session = session
+        return self.session
+
+    def httpOptions(self, timeoutExpr, methodExpr, cacheExpr, lineNum):
+        timeout = self.numberOption(timeoutExpr, self.httpTimeout, "http_check timeout", lineNum, positive=True)
+        method = 'GET'
+        if methodExpr is not None:
+            method = str(methodExpr.evaluate(self)).upper()
+            if method not in HTTP_METHODS:
+                raise VPOLException("http_check method must be GET or HEAD")
+        cacheTtl = self.numberOption(cacheExpr, 0, "http_check cache", lineNum)
+        return self.limitTimeout(timeout, self.networkLimit()), method, cacheTtl
+
+    def httpRequest(self, url, timeout, method, cacheTtl=0):
+        if cacheTtl:
+            found, result = self.resultCache.get(('http', method, url))
+            if found:
+                return result
+
+        requests = loadBackend('requests')
+        start = time.perf_counter()
+        try:
+            response = self.httpSession().request(method, url, timeout=timeout, allow_redirects=method == 'GET')
+            result = response.status_code, time.perf_counter() - start, None
         except requests.RequestException as e:
-            print(f"Failed to connect to {url}. Error: {str(e)}")
+            result = None, time.perf_counter() - start, str(e)
+        if cacheTtl:
+            self.resultCache.put(('http', method, url), result, cacheTtl)
+        return result
 
-    def sendPacket(self, line, lineNum):
-        match = re.search(r'network\.send_packet\((.*?)\)', line)
-        if not match:
-            raise VPOLException("Invalid send_packet statement")
-        
-        args = [self.evaluate(arg.strip(), lineNum) for arg in match.group(1).split(',')]
+    def checkHttp(self, instruction):
+        urlExpr, timeoutExpr, methodExpr, cacheExpr = instruction.args
+        url = urlExpr.evaluate(self)
+        timeout, method, cacheTtl = self.httpOptions(timeoutExpr, methodExpr, cacheExpr, instruction.lineNum)
+        status, elapsed, error = self.httpRequest(url, timeout, method, cacheTtl)
+        if error is None:
+            self.emit(f"Successfully connected to {url}. Status code: {status}")
+        else:
+            self.emit(f"Failed to connect to {url}. Error: {error}")
+
+    def checkHttpMany(self, instruction):
+        urlExprs, varName, timeoutExpr, methodExpr, cacheExpr = instruction.args
+        timeout, method, cacheTtl = self.httpOptions(timeoutExpr, methodExpr, cacheExpr, instruction.lineNum)
+        urls = []
+        for urlExpr in urlExprs:
+            value = urlExpr.evaluate(self)
+            if isinstance(value, list):
+                urls.extend(str(url) for url in value)
+            else:
+                urls.extend(url.strip() for url in str(value).split(',') if url.strip())
+
+        results = []
+        if urls:
+            with ThreadPoolExecutor(max_workers=min(self.maxConcurrency, len(urls))) as pool:
+                responses = pool.map(lambda url: self.httpRequest(url, timeout, method, cacheTtl), urls)
+                for url, (status, elapsed, error) in zip(urls, responses):
+                    results.append({"url": url, "status": status, "latency_ms": round(elapsed * 1000, 2), "error": error})
+
+        self.storeRecords(varName, results, {"status": "status", "latency": "latency_ms"})
+
+    def sendPacket(self, instruction):
+        argExprs, varName, countExpr, rateExpr, waitExpr, timeoutExpr = instruction.args
+        lineNum = instruction.lineNum
+        args = [arg.evaluate(self) for arg in argExprs]
+        if len(args) == 1:
+            args = [arg.strip() for arg in formatValue(args[0]).split(',')]
         if len(args) != 4:
             raise VPOLException("send_packet requires 4 arguments: IP, port, protocol, size")
-        
-        ip, port, protocol, size = args
-        port = int(port)
-        size = int(size)
+
+        ip, port, protocol, size = (formatValue(arg).strip() for arg in args)
+        ports = parsePorts(port)
+        try:
+            size = int(size)
+        except ValueError:
+            raise VPOLException("send_packet size must be a number")
+        count = self.numberOption(countExpr, 1, "send_packet count", lineNum, int, 1)
+        rate = self.numberOption(rateExpr, 0, "send_packet rate", lineNum)
+        timeout = self.numberOption(timeoutExpr, None, "send_packet timeout", lineNum)
+        limit = self.networkLimit()
+        bulk = count > 1 or len(ports) > 1
+        wait = not bulk
+        if waitExpr is not None:
+            wait = formatValue(waitExpr.evaluate(self)).lower() in ('true', 'yes', '1')
 
         if protocol.lower() not in ['tcp', 'udp']:
             raise VPOLException("Protocol must be either 'tcp' or 'udp'")
 
+        scapy = loadBackend('scapy.all')
+        layer = scapy.TCP if protocol.lower() == 'tcp' else scapy.UDP
+        payload = 'X' * size
+        address = self.resolveHost(ip) or ip
+
+        if not bulk and wait:
+            try:
+                packet = scapy.IP(dst=address)/layer(dport=ports[0])/payload
+                response = scapy.sr1(packet, verbose=0, timeout=self.limitTimeout(DEFAULT_PACKET_TIMEOUT if timeout is None else timeout, limit))
+                if response:
+                    self.emit(f"Packet sent successfully to {ip}:{port} using {protocol.upper()}. Response received.")
+                else:
+                    self.emit(f"Packet sent to {ip}:{port} using {protocol.upper()}, but no response received.")
+            except Exception as e:
+                self.emit(f"Failed to send packet to {ip}:{port}. Error: {str(e)}")
+            return
+
+        packets = [scapy.IP(dst=address)/layer(dport=dport)/payload for dport in ports]
+        total = count * len(packets)
+        responses = None
         try:
-            if protocol.lower() == 'tcp':
-                packet = IP(dst=ip)/TCP(dport=port)/('X' * size)
+            if wait:
+                start = time.perf_counter()
+                answered, _ = scapy.sr(packets * count, verbose=0, inter=1.0 / rate if rate else 0,
+                                        timeout=self.limitTimeout(DEFAULT_PACKET_TIMEOUT if timeout is None else timeout, limit))
+                elapsed = time.perf_counter() - start
+                responses = len(answered)
+                frameBytes = sum(len(packet) for packet in packets) * count
             else:
-                packet = IP(dst=ip)/UDP(dport=port)/('X' * size)
+                send, close, frames = openPacketSender(scapy, packets, address)
+                try:
+                    elapsed = sendBatched(send, total, rate, limit)
+                finally:
+                    close()
+                frameBytes = sum(len(frame) for frame in frames) * count
+        except VPOLException:
+            raise
+        except Exception as e:
+            raise VPOLException(f"Failed to send packets to {ip}:{port}. Error: {str(e)}")
+
+        stats = {
+            "sent": total,
+            "seconds": round(elapsed, 4),
+            "pps": round(total / elapsed, 1) if elapsed > 0 else None,
+            "mbps": round(frameBytes * 8 / elapsed / 1e6, 3) if elapsed > 0 else None,
+            "responses": responses,
+        }
+        if varName is None:
+            report = f"Sent {total} {protocol.upper()} packets to {ip}:{port} in {stats['seconds']}s ({stats['pps']} packets/s, {stats['mbps']} Mbit/s)"
+            if responses is not None:
+                report += f", {responses} responses"
+            self.emit(report)
+        else:
+            self.vars[varName] = stats
+            for field, value in stats.items():
+                self.vars[f"{varName}_{field}"] = "" if value is None else value
 
-            response = sr1(packet, verbose=0)
-            if response:
-                print(f"Packet sent successfully to {ip}:{port} using {protocol.upper()}. Response received.")
+    def scanPorts(self, instruction):
+        hostExpr, portsExpr, protocolExpr, varName, timeoutExpr, rateExpr = instruction.args
+        lineNum = instruction.lineNum
+        protocol = formatValue(protocolExpr.evaluate(self)).strip().lower()
+        if protocol not in ('tcp', 'udp'):
+            raise VPOLException("Protocol must be either 'tcp' or 'udp'")
+        ports = parsePortList(portsExpr.evaluate(self))
+        timeout = self.limitTimeout(self.numberOption(timeoutExpr, DEFAULT_SCAN_TIMEOUT, "scan timeout", lineNum), self.networkLimit())
+        rate = self.numberOption(rateExpr, 0, "scan rate", lineNum)
+
+        hosts = self.resolveHosts((hostExpr,), lineNum)
+        addresses = list(dict.fromkeys(address for _, address in hosts if address))
+        states = {}
+        start = time.perf_counter()
+        if addresses:
+            scapy = loadBackend('scapy.all')
+            if protocol == 'tcp':
+                probes = scapy.IP(dst=addresses)/scapy.TCP(sport=scapy.RandShort(), dport=ports, flags='S')
             else:
-                print(f"Packet sent to {ip}:{port} using {protocol.upper()}, but no response received.")
+                probes = scapy.IP(dst=addresses)/scapy.UDP(sport=scapy.RandShort(), dport=ports)
+            try:
+                answered, _ = scapy.sr(probes, timeout=timeout, inter=1.0 / rate if rate else 0, verbose=0)
+            except Exception as e:
+                raise VPOLException(f"Failed to scan: {str(e)}")
+            for sent, reply in answered:
+                states[(sent.dst, sent.dport)] = classifyScanReply(scapy, protocol, reply)
+        elapsed = time.perf_counter() - start
+
+        unanswered = 'filtered' if protocol == 'tcp' else 'open_filtered'
+        results = []
+        for host, address in hosts:
+            record = {"host": host, "address": address, "protocol": protocol}
+            for state in SCAN_STATES:
+                record[state] = []
+            if address:
+                for port in ports:
+                    record[states.get((address, port), unanswered)].append(port)
+            results.append(record)
+
+        totals = {state: sum(len(record[state]) for record in results) for state in SCAN_STATES}
+        if varName is None:
+            for record in results:
+                if record["address"] is None:
+                    self.emit(f"Failed to scan {record['host']}: host could not be resolved")
+                elif record["open"] or record["closed"]:
+                    self.emit(f"Scan {record['host']} ({record['address']}): open {','.join(map(str, record['open'])) or '-'}; closed {len(record['closed'])}; filtered {len(record['filtered']) + len(record['open_filtered'])}")
+            self.emit(f"Scanned {len(addresses)} hosts x {len(ports)} {protocol.upper()} ports in {elapsed:.2f}s: {totals['open']} open, {totals['closed']} closed, {totals['filtered'] + totals['open_filtered']} filtered")
+        else:
+            self.vars[varName] = results
+            self.vars[f"{varName}_count"] = len(results)
+            self.vars[f"{varName}_seconds"] = round(elapsed, 3)
+            for state in SCAN_STATES:
+                self.vars[f"{varName}_{state}"] = totals[state]
+            self.vars[f"{varName}_open_ports"] = ",".join(f"{record['address']}:{port}" for record in results for port in record["open"])
+
+    def evaluate(self, expr, lineNum=None):
+        if isinstance(expr, str):
+            expr = compileExpression(expr, self.slotTable)
+        return expr.evaluate(self)
+
+class ProcessorPool:
+    def __init__(self, size, configure):
+        self.processors = queue.Queue()
+        self.inputs = {}
+        for _ in range(size):
+            processor = VPOLProcessor()
+            configure(processor)
+            self.inputs = processor.inputs
+            self.processors.put(processor)
+
+    def acquire(self):
+        return self.processors.get()
+
+    def release(self, processor):
+        processor.reset()
+        processor.output = processor.stdout
+        processor.errorOutput = None
+        processor.inputs = self.inputs
+        self.processors.put(processor)
+
+class RemoteOutput:
+    def __init__(self, stream, channel="output"):
+        self.stream = stream
+        self.channel = channel
+
+    def write(self, text):
+        if text:
+            self.stream.write(json.dumps({self.channel: text}).encode() + b"\n")
+            self.stream.flush()
+
+    def flush(self):
+        self.stream.flush()
+
+class VPOLRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            code = request["code"]
+        except (ValueError, KeyError, TypeError):
+            self.reply({"error": "Malformed request"})
+            return
+
+        pool = self.server.pool
+        processor = pool.acquire()
+        try:
+            processor.output = RemoteOutput(self.wfile)
+            processor.errorOutput = RemoteOutput(self.wfile, "stderr")
+            processor.inputs = dict(pool.inputs, **(request.get("inputs") or {}))
+            exitCode = processor.run(code, self.server.programCache)
+            self.reply({"exit": exitCode})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
         except Exception as e:
-            print(f"Failed to send packet to {ip}:{port}. Error: {str(e)}")
-
-    def evaluate(self, expr, lineNum):
-        if '+' in expr:
-            parts = re.split(r'(\+)', expr)
-            result = ''
-            for part in parts:
-                if part.strip() == '+':
-                    continue
-                result += str(self.evaluate(part.strip(), lineNum))
-            return result
+            self.reply({"error": f"{type(e).__name__}: {e}"})
+        finally:
+            pool.release(processor)
 
-        if expr.startswith('@'):
-            varName = expr[1:]
-            if varName in self.vars:
-                return self.vars[varName]
-            else:
-                raise VPOLException(f"Variable '{varName}' not defined.")
-        
-        return expr.strip().strip('"')
+    def reply(self, message):
+        try:
+            self.wfile.write(json.dumps(message).encode() + b"\n")
+            self.wfile.flush()
+        except OSError:
+            pass
+
+class VPOLServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socketPath, workers, configure):
+        self.pool = ProcessorPool(workers, configure)
+        self.programCache = MemoryCache()
+        super().__init__(socketPath, VPOLRequestHandler)
+
+def defaultSocketPath():
+    runtimeDir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtimeDir and os.path.isdir(runtimeDir):
+        return os.path.join(runtimeDir, "vpol.sock")
+    return os.path.join(socketDirectory(), "vpol.sock")
+
+def socketDirectory():
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join("/tmp", f"vpol-{uid}")
+
+def checkSocketDirectory(socketPath, create=False):
+    directory = os.path.dirname(socketPath)
+    if directory != socketDirectory() or not hasattr(os, "getuid"):
+        return
+    if create:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise VPOLException(f"{directory} must be a directory owned by the current user with mode 0700")
+
+def serve(socketPath, workers, configure):
+    if not hasattr(socket, "AF_UNIX"):
+        print("Server mode requires Unix domain sockets, which this platform does not support.", file=sys.stderr)
+        return 1
+    try:
+        checkSocketDirectory(socketPath, create=True)
+    except (OSError, VPOLException) as e:
+        print(f"Cannot use socket {socketPath}: {e}", file=sys.stderr)
+        return 1
+    if os.path.exists(socketPath):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socketPath)
+            print(f"A VPOL server is already listening on {socketPath}", file=sys.stderr)
+            return 1
+        except OSError:
+            os.unlink(socketPath)
+        finally:
+            probe.close()
+
+    server = VPOLServer(socketPath, workers, configure)
+    print(f"VPOL server listening on {socketPath} with {workers} interpreter(s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socketPath):
+            os.unlink(socketPath)
+    return 0
+
+def runRemote(socketPath, scriptPath, code, inputs=None):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        checkSocketDirectory(socketPath)
+        client.connect(socketPath)
+    except (OSError, VPOLException) as e:
+        print(f"Cannot connect to VPOL server at {socketPath}: {e}", file=sys.stderr)
+        return 1
+
+    with client, client.makefile('rwb') as stream:
+        stream.write(json.dumps({"script": os.path.abspath(scriptPath), "code": code, "inputs": inputs or {}}).encode() + b"\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if "output" in message:
+                sys.stdout.write(message["output"])
+                sys.stdout.flush()
+            elif "stderr" in message:
+                sys.stderr.write(message["stderr"])
+                sys.stderr.flush()
+            elif "exit" in message:
+                return message["exit"]
+            elif "error" in message:
+                print(f"VPOL server error: {message['error']}", file=sys.stderr)
+                return 1
+    print("VPOL server closed the connection unexpectedly", file=sys.stderr)
+    return 1
+
+workerProcessor = None
+workerUseCache = True
+
+def initBatchWorker(settings):
+    global workerProcessor, workerUseCache
+    workerProcessor = VPOLProcessor()
+    workerProcessor.maxConcurrency = settings["maxConcurrency"]
+    workerProcessor.httpTimeout = settings["httpTimeout"]
+    for attribute, value in settings["budgets"].items():
+        setattr(workerProcessor, attribute, value)
+    workerProcessor.interactive = False
+    workerUseCache = settings["useCache"]
+
+def runBatchScript(scriptPath):
+    output = io.StringIO()
+    start = time.perf_counter()
+    workerProcessor.reset()
+    workerProcessor.output = output
+    workerProcessor.errorOutput = output
+    try:
+        with open(scriptPath, 'r') as f:
+            code = f.read()
+        exitCode = workerProcessor.run(code, BytecodeCache(scriptPath) if workerUseCache else None)
+    except Exception:
+        output.write(traceback.format_exc())
+        exitCode = EXIT_CRASH
+    finally:
+        workerProcessor.output = workerProcessor.stdout
+        workerProcessor.errorOutput = None
+    return {
+        "script": scriptPath,
+        "exit_code": exitCode,
+        "seconds": round(time.perf_counter() - start, 6),
+        "output": output.getvalue(),
+    }
+
+def findScripts(targets):
+    scripts = []
+    for target in targets:
+        if os.path.isdir(target):
+            scripts.extend(glob.glob(os.path.join(target, '**', '*.vpol'), recursive=True))
+        else:
+            scripts.extend(glob.glob(target, recursive=True))
+    return sorted(set(os.path.normpath(script) for script in scripts if os.path.isfile(script)))
+
+def parseAssignment(text):
+    name, separator, value = text.partition('=')
+    name = name.strip().lstrip('@')
+    if not separator or not re.fullmatch(r'\w+', name):
+        raise ValueError(f"expected NAME=VALUE, got '{text}'")
+    return name, value
+
+def parseEnvFile(path):
+    values = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineNum, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('export '):
+                line = line[7:]
+            try:
+                name, value = parseAssignment(line)
+            except ValueError as e:
+                raise ValueError(f"line {lineNum}: {e}")
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+                value = value[1:-1]
+            values[name] = value
+    return values
+
+def loadParams(path):
+    lowered = path.lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if lowered.endswith(NDJSON_EXTENSIONS):
+            rows = list(iterNdjson(f))
+        elif lowered.endswith('.json'):
+            rows = json.load(f)
+            if not isinstance(rows, list):
+                raise ValueError("a JSON parameter file must hold an array of objects")
+        else:
+            rows = list(csv.DictReader(f))
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise ValueError(f"row {number} is not an object")
+        if None in row:
+            raise ValueError(f"row {number} has more values than there are columns")
+    return rows
+
+def runMatrixRow(pool, instructions, index, row, inputs):
+    output = io.StringIO()
+    start = time.perf_counter()
+    processor = pool.acquire()
+    try:
+        processor.output = output
+        processor.errorOutput = output
+        processor.inputs = dict(inputs, **row)
+        exitCode = processor.runCompiled(instructions)
+    except Exception:
+        output.write(traceback.format_exc())
+        exitCode = EXIT_CRASH
+    finally:
+        pool.release(processor)
+    return {
+        "row": index,
+        "params": row,
+        "exit_code": exitCode,
+        "seconds": round(time.perf_counter() - start, 6),
+        "output": output.getvalue(),
+    }
+
+def runMatrix(instructions, rows, inputs, workers, configure, reportPath, outputDir):
+    dnsCache = TtlCache(DNS_CACHE_SIZE)
+    resultCache = TtlCache(RESULT_CACHE_SIZE)
+
+    def configureRow(processor):
+        configure(processor)
+        processor.interactive = False
+        processor.dnsCache = dnsCache
+        processor.resultCache = resultCache
+
+    workers = max(1, min(workers, len(rows)))
+    pool = ProcessorPool(workers, configureRow)
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(runMatrixRow, pool, instructions, index, row, inputs): index for index, row in enumerate(rows, 1)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["row"]] = result
+            status = "ok" if result["exit_code"] == EXIT_OK else f"exit {result['exit_code']}"
+            params = " ".join(f"{name}={value}" for name, value in result["params"].items())
+            print(f"[{status:>6}] {result['seconds']:>8.3f}s  row {result['row']}  {params}")
+
+    ordered = [results[index] for index in range(1, len(rows) + 1)]
+    failed = sum(1 for result in ordered if result["exit_code"] != EXIT_OK)
+    report = {
+        "vpol_version": VPOL_VERSION,
+        "workers": workers,
+        "total": len(ordered),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 6),
+        "rows": ordered,
+    }
+
+    if outputDir:
+        os.makedirs(outputDir, exist_ok=True)
+        for result in ordered:
+            with open(os.path.join(outputDir, f"row-{result['row']}.out"), 'w') as f:
+                f.write(result["output"])
+
+    with open(reportPath, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    print(f"{len(ordered) - failed}/{len(ordered)} rows succeeded in {report['seconds']:.2f}s, report written to {reportPath}")
+    return EXIT_OK if failed == 0 else EXIT_ERROR
+
+def runMany(argv):
+    parser = argparse.ArgumentParser(prog="vpol run-many", description="Run many VPOL scripts in parallel worker processes.")
+    parser.add_argument("targets", nargs="+", help="script files, glob patterns or directories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, metavar="N", help="number of worker processes (default: %(default)s)")
+    parser.add_argument("--report", default="vpol-report.json", metavar="PATH", help="summary JSON report path (default: %(default)s)")
+    parser.add_argument("--output-dir", default=None, metavar="DIR", help="also write each script's output to DIR/<script>.out")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the compiled script cache")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, metavar="N", help="default worker limit for parallel blocks (default: %(default)s)")
+    parser.add_argument("--http-timeout", type=duration, default=DEFAULT_HTTP_TIMEOUT, metavar="SECONDS", help="default timeout for network.http_check (default: %(default)s)")
+    addBudgetArguments(parser)
+    args = parser.parse_args(argv)
+
+    scripts = findScripts(args.targets)
+    if not scripts:
+        print("No .vpol scripts found", file=sys.stderr)
+        return EXIT_ERROR
+
+    settings = {
+        "maxConcurrency": max(1, args.max_concurrency),
+        "httpTimeout": args.http_timeout,
+        "useCache": not args.no_cache,
+        "budgets": budgetSettings(args),
+    }
+    workers = max(1, min(args.workers, len(scripts)))
+    start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=initBatchWorker, initargs=(settings,)) as pool:
+        futures = {pool.submit(runBatchScript, script): script for script in scripts}
+        for future in as_completed(futures):
+            script = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"script": script, "exit_code": EXIT_CRASH, "seconds": None, "output": f"Worker failed: {e}\n"}
+            results[script] = result
+            status = "ok" if result["exit_code"] == EXIT_OK else f"exit {result['exit_code']}"
+            seconds = "-" if result["seconds"] is None else f"{result['seconds']:.3f}s"
+            print(f"[{status:>6}] {seconds:>9}  {script}")
+
+    ordered = [results[script] for script in scripts]
+    failed = sum(1 for result in ordered if result["exit_code"] != EXIT_OK)
+    report = {
+        "vpol_version": VPOL_VERSION,
+        "workers": workers,
+        "total": len(ordered),
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 6),
+        "scripts": ordered,
+    }
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        for result in ordered:
+            name = os.path.splitdrive(os.path.abspath(result["script"]))[1].strip(os.sep).replace(os.sep, "__")
+            with open(os.path.join(args.output_dir, name + ".out"), 'w') as f:
+                f.write(result["output"])
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    print(f"{len(ordered) - failed}/{len(ordered)} scripts succeeded in {report['seconds']:.2f}s, report written to {args.report}")
+    return EXIT_OK if failed == 0 else EXIT_ERROR
+
+def isLargeScript(path):
+    try:
+        return os.path.getsize(path) > STREAM_SCRIPT_SIZE
+    except OSError:
+        return False
 
 def main():
-    if len(sys.argv) != 2:
+    if len(sys.argv) > 1 and sys.argv[1] == "run-many":
+        sys.exit(runMany(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(prog="vpol", usage="python vpol.py [options] <script.vpol>\n       python vpol.py run-many [options] <glob or directory>...")
+    parser.add_argument("script", nargs="?", help="VPOL script to run, or - to read it from stdin")
+    parser.add_argument("--stream", action="store_true", help="execute the script while reading it, without loading it into memory")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the compiled script cache")
+    parser.add_argument("--clear-cache", action="store_true", help="remove cached compiled forms of the script and exit")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, metavar="N", help="default worker limit for parallel blocks (default: %(default)s)")
+    parser.add_argument("--http-timeout", type=duration, default=DEFAULT_HTTP_TIMEOUT, metavar="SECONDS", help="default timeout for network.http_check (default: %(default)s)")
+    parser.add_argument("--serve", action="store_true", help="keep interpreters warm and run scripts sent over a local socket")
+    parser.add_argument("--remote", action="store_true", help="run the script on a running VPOL server")
+    parser.add_argument("--socket", default=None, metavar="PATH", help="server socket path (default: %s)" % defaultSocketPath())
+    parser.add_argument("--workers", type=int, default=DEFAULT_SERVER_WORKERS, metavar="N", help="interpreters kept by the server (default: %(default)s)")
+    parser.add_argument("--buffering", choices=BUFFERING_MODES, default="auto", help="output buffering: line, block, or full; auto uses line for terminals and full otherwise (default: %(default)s)")
+    parser.add_argument("--output", default=None, metavar="PATH", help="write script output to PATH instead of stdout")
+    parser.add_argument("--profile", action="store_true", help="report per-line and per-function timings after the run")
+    parser.add_argument("--trace", default=None, metavar="PATH", help="write a Chrome trace-event JSON file of the run")
+    parser.add_argument("--startup-profile", action="store_true", help="report the import and load time of each subsystem")
+    parser.add_argument("--dns-ttl", type=float, default=DNS_CACHE_TTL, metavar="SECONDS", help="how long resolved host names are reused; 0 disables the DNS cache (default: %(default)s)")
+    parser.add_argument("--cache-stats", action="store_true", help="report DNS and result cache hits and misses after the run")
+    addBudgetArguments(parser)
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE", help="set @NAME before the script runs; terminal.input uses it instead of prompting")
+    parser.add_argument("--env-file", default=None, metavar="PATH", help="read NAME=VALUE lines from PATH as with --var")
+    parser.add_argument("--params", default=None, metavar="PATH", help="CSV, NDJSON or JSON table of variables; one row unless --matrix is given")
+    parser.add_argument("--matrix", action="store_true", help="run the script once for every row of --params")
+    parser.add_argument("--matrix-workers", type=int, default=1, metavar="N", help="rows run at the same time with --matrix (default: %(default)s)")
+    parser.add_argument("--report", default="vpol-matrix.json", metavar="PATH", help="summary JSON report path with --matrix (default: %(default)s)")
+    parser.add_argument("--output-dir", default=None, metavar="DIR", help="with --matrix, also write each row's output to DIR/row-<n>.out")
+    args = parser.parse_args()
+
+    inputs = {}
+    rows = None
+    try:
+        if args.env_file:
+            inputs.update(parseEnvFile(args.env_file))
+        for assignment in args.var:
+            name, value = parseAssignment(assignment)
+            inputs[name] = value
+        if args.params:
+            rows = loadParams(args.params)
+    except (OSError, ValueError, VPOLException) as e:
+        print(f"Cannot load script inputs: {e}", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if args.matrix and rows is None:
+        print("--matrix needs a --params table", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if rows is not None and not args.matrix:
+        if len(rows) != 1:
+            print(f"{args.params} has {len(rows)} rows; pass --matrix to run the script once per row", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        inputs.update(rows[0])
+
+    outputFile = None
+
+    def configure(processor):
+        processor.maxConcurrency = max(1, args.max_concurrency)
+        processor.httpTimeout = args.http_timeout
+        processor.dnsTtl = args.dns_ttl
+        for attribute, value in budgetSettings(args).items():
+            setattr(processor, attribute, value)
+        processor.stdout = OutputBuffer(outputFile or sys.stdout, args.buffering)
+        processor.output = processor.stdout
+        processor.inputs = inputs
+
+    socketPath = args.socket or defaultSocketPath()
+    if args.serve:
+        def configureServer(processor):
+            configure(processor)
+            processor.interactive = False
+        sys.exit(serve(socketPath, max(1, args.workers), configureServer))
+
+    if not args.script:
         print("Usage: python vpol.py <script.vpol>")
         sys.exit(1)
 
-    script_file = sys.argv[1]
-    
+    script_file = args.script
+    if args.matrix and (script_file == "-" or args.stream or args.remote):
+        print("--matrix cannot be combined with --stream, --remote or a script read from stdin", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if (args.profile or args.trace) and (script_file == "-" or args.stream):
+        print("--profile and --trace cannot be combined with --stream or a script read from stdin", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+
+    if args.clear_cache:
+        removed = BytecodeCache(script_file).clear()
+        print(f"Removed {removed} cached file(s) for {script_file}")
+        return
+
+    if args.output and not args.remote:
+        outputFile = open(args.output, 'w')
+
+    stream = args.stream or script_file == "-"
+    if not (stream or args.remote or args.matrix or args.profile or args.trace):
+        stream = isLargeScript(script_file)
+    if stream:
+        processor = VPOLProcessor()
+        configure(processor)
+        if script_file == "-":
+            processor.interactive = False
+            exitCode = processor.runStream(sys.stdin)
+        else:
+            with open(script_file, 'r') as f:
+                exitCode = processor.runStream(f)
+        if args.startup_profile:
+            printStartupProfile()
+        if args.cache_stats:
+            printCacheStats(processor)
+        sys.exit(exitCode)
+
     with open(script_file, 'r') as f:
         code = f.read()
 
+    if args.remote:
+        sys.exit(runRemote(socketPath, script_file, code, inputs))
+
+    if args.matrix:
+        cache = None if args.no_cache else BytecodeCache(script_file)
+        instructions = cache.load(code) if cache else None
+        if instructions is None:
+            instructions = VPOLProcessor().compile(code)
+            if cache:
+                cache.store(code, instructions)
+        sys.exit(runMatrix(instructions, rows, inputs, args.matrix_workers, configure, args.report, args.output_dir))
+
+    cache = None if args.no_cache else BytecodeCache(script_file)
     processor = VPOLProcessor()
-    processor.run(code)
+    configure(processor)
+    profiler = None
+    if args.profile or args.trace:
+        profiler = Profiler(code.split('\n'), trace=bool(args.trace))
+        processor.enableProfiling(profiler)
+    exitCode = processor.run(code, cache)
+
+    if profiler is not None:
+        if args.profile:
+            profiler.report(sys.stderr)
+        if args.trace:
+            profiler.writeTrace(args.trace)
+            print(f"Trace written to {args.trace}", file=sys.stderr)
+
+    if args.startup_profile:
+        printStartupProfile()
+    if args.cache_stats:
+        printCacheStats(processor)
+    sys.exit(exitCode)
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,99 @@ from tkinter import filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
 import re
 import os
+import time
+import queue
+import traceback
+import multiprocessing
+
+HIGHLIGHT_DELAY_MS = 120
+HIGHLIGHT_IDLE_MS = 1
+HIGHLIGHT_IDLE_CHUNK = 200
+HIGHLIGHT_TAGS = ("keyword", "variable", "string", "bracket", "comment", "ifstmt", "function", "dollar", "tilde")
+RUN_POLL_MS = 50
+RUN_POLL_BATCH = 500
+TEXT_PROXY = """
+if {{[lindex $args 0] ni {{insert replace delete}}}} {{
+    return [{original} {{*}}$args]
+}}
+set edit [{measure} {{*}}$args]
+set result [{original} {{*}}$args]
+if {{$edit ne ""}} {{
+    {record} {{*}}$edit
+}}
+return $result
+"""
+errorLinePattern = re.compile(r'VPOL Error on line (\d+)')
+KEYWORDS = ["terminal.print", "terminal.flush", "terminal.set_title", "terminal.input", "cls", "network.ping", "network.http_check", "network.http_check_many", "network.send_packet", "network.scan", "json.parse", "json.get", "json.load_file", "repeat", "for", "parallel", "every", "after", "spawn"]
+
+keywordPattern = re.compile(r"\b(?:" + "|".join(re.escape(keyword) for keyword in KEYWORDS) + r")\b")
+linePatterns = [
+    ("function", re.compile(r'def\s+(\w+)\s*:')),
+    ("variable", re.compile(r'@\w+')),
+    ("string", re.compile(r'("[^"]*")')),
+    ("bracket", re.compile(r'[\(\)\[\]\{\}]')),
+    ("ifstmt", re.compile(r'if\s+@\w+\s*=\s*".*?":')),
+    ("dollar", re.compile(r'\$')),
+    ("tilde", re.compile(r'~')),
+]
+
+def tokenizeLine(text, inComment):
+    spans = []
+    for match in keywordPattern.finditer(text):
+        spans.append(("keyword", match.start(), match.end()))
+    for tag, pattern in linePatterns:
+        for match in pattern.finditer(text):
+            spans.append((tag, match.start(), match.end()))
+
+    position = 0
+    while position <= len(text):
+        if inComment:
+            end = text.find("]]", position)
+            if end == -1:
+                spans.append(("comment", position, len(text)))
+                break
+            spans.append(("comment", position, end + 2))
+            position = end + 2
+            inComment = False
+            continue
+        start = text.find("#", position)
+        if start == -1:
+            break
+        if text.startswith("#[[", start):
+            inComment = True
+            spans.append(("comment", start, start + 3))
+            position = start + 3
+        else:
+            spans.append(("comment", start, len(text)))
+            break
+    return spans, inComment
+
+class QueueOutput:
+    def __init__(self, channel, kind="output"):
+        self.channel = channel
+        self.kind = kind
+
+    def write(self, text):
+        if text:
+            self.channel.put((self.kind, text))
+
+    def flush(self):
+        pass
+
+def runWorker(code, directory, channel):
+    import vpol
+    if directory:
+        os.chdir(directory)
+    processor = vpol.VPOLProcessor()
+    processor.output = vpol.OutputBuffer(QueueOutput(channel), 'line')
+    processor.errorOutput = QueueOutput(channel, "error")
+    processor.interactive = False
+    try:
+        exitCode = processor.run(code)
+    except Exception:
+        channel.put(("error", traceback.format_exc()))
+        exitCode = vpol.EXIT_CRASH
+    channel.put(("exit", exitCode))
 
 class VPOLEditor:
     def __init__(self, root):
@@ -16,8 +109,20 @@ class VPOLEditor:
         if os.path.exists(icon_path):
             self.root.iconbitmap(icon_path)
 
-        self.textArea = ScrolledText(self.root, wrap=tk.WORD, bg="#282c34", fg="#abb2bf", insertbackground="white", font=("Consolas", 12))
-        self.textArea.pack(expand=True, fill='both')
+        self.statusBar = tk.Label(self.root, anchor='w', bg="#21252b", fg="#abb2bf")
+        self.statusBar.pack(side=tk.BOTTOM, fill='x')
+        self.panes = tk.PanedWindow(self.root, orient=tk.VERTICAL, sashwidth=4, bg="#21252b")
+        self.panes.pack(expand=True, fill='both')
+
+        self.textArea = ScrolledText(self.panes, wrap=tk.WORD, bg="#282c34", fg="#abb2bf", insertbackground="white", font=("Consolas", 12))
+        self.panes.add(self.textArea, stretch="always")
+        self.outputArea = ScrolledText(self.panes, wrap=tk.WORD, height=10, bg="#21252b", fg="#abb2bf", font=("Consolas", 11), state=tk.DISABLED)
+        self.outputArea.tag_configure("error", foreground="#e06c75")
+        self.outputArea.tag_configure("link", underline=True)
+        self.outputArea.tag_configure("status", foreground="#5c6370")
+        self.outputArea.tag_bind("link", "<Enter>", lambda event: self.outputArea.config(cursor="hand2"))
+        self.outputArea.tag_bind("link", "<Leave>", lambda event: self.outputArea.config(cursor=""))
+        self.runPanelShown = False
 
         self.menuBar = tk.Menu(self.root)
         self.root.config(menu=self.menuBar)
@@ -30,19 +135,45 @@ class VPOLEditor:
         self.fileMenu.add_separator()
         self.fileMenu.add_command(label="Exit", command=self.exitApplication)
 
+        self.runMenu = tk.Menu(self.menuBar, tearoff=0)
+        self.menuBar.add_cascade(label="Run", menu=self.runMenu)
+        self.runMenu.add_command(label="Run Script", accelerator="F5", command=self.runScript)
+        self.runMenu.add_command(label="Cancel", accelerator="Shift+F5", command=self.cancelRun)
+        self.runMenu.add_command(label="Clear Output", command=self.clearOutput)
+
+        self.runProcess = None
+        self.runChannel = None
+        self.runStarted = None
+        self.runErrors = 0
+
         self.currentFile = None
+        self.lineStates = [False]
+        self.staleLines = set()
+        self.lineCount = 1
+        self.highlightJob = None
+        self.idleJob = None
         self.createTags()
-        self.textArea.bind("<KeyRelease>", self.highlightSyntax)
+        self.installEditHook()
+        self.textArea['yscrollcommand'] = self.onScroll
+        self.textArea.bind("<Configure>", lambda event: self.scheduleHighlight())
         self.textArea.bind("<Return>", self.autoIndent)
 
         self.root.bind('<Control-n>', lambda event: self.newFile())
         self.root.bind('<Control-s>', lambda event: self.saveFile())
+        self.root.bind('<F5>', lambda event: self.runScript())
+        self.root.bind('<Shift-F5>', lambda event: self.cancelRun())
+        self.root.protocol("WM_DELETE_WINDOW", self.exitApplication)
 
         self.textArea.bind("<<Modified>>", self.on_modified)
 
     def on_modified(self, event):
         self.textArea.edit_modified(False)
 
+    def onScroll(self, first, last):
+        self.textArea.vbar.set(first, last)
+        if self.staleLines:
+            self.scheduleHighlight()
+
     def createTags(self):
         defaultFont = tkfont.Font(font=self.textArea['font'])
         italicFont = tkfont.Font(font=self.textArea['font'])
@@ -64,6 +195,7 @@ class VPOLEditor:
         if self.checkUnsavedChanges():
             self.textArea.delete(1.0, tk.END)
             self.currentFile = None
+            self.rehighlightAll()
 
     def openFile(self):
         if self.checkUnsavedChanges():
@@ -74,7 +206,7 @@ class VPOLEditor:
                     self.textArea.delete(1.0, tk.END)
                     self.textArea.insert(tk.END, content)
                 self.currentFile = filePath
-                self.highlightSyntax()
+                self.rehighlightAll()
 
     def saveFile(self):
         if self.currentFile:
@@ -105,77 +237,184 @@ class VPOLEditor:
 
         return "break"
 
+    def currentLineCount(self):
+        return int(self.textArea.index("end-1c").split('.')[0])
+
+    def installEditHook(self):
+        widget = self.textArea._w
+        self.textCommand = widget + "_orig"
+        self.root.tk.call("rename", widget, self.textCommand)
+        body = TEXT_PROXY.format(original=self.textCommand, measure=self.root.register(self.measureEdit), record=self.root.register(self.recordEdit))
+        self.root.tk.call("proc", widget, "args", body)
+
+    def textLine(self, index):
+        return min(int(self.root.tk.call(self.textCommand, "index", index).split('.')[0]), self.lineCount)
+
+    def measureEdit(self, *args):
+        try:
+            if args[0] == "insert":
+                return self.textLine(args[1]), 0, sum(text.count("\n") for text in args[2::2])
+            first = self.textLine(args[1])
+            last = self.textLine(args[2] if len(args) > 2 else f"{args[1]}+1c")
+            added = sum(text.count("\n") for text in args[3::2]) if args[0] == "replace" else 0
+            return first, last - first, added
+        except (tk.TclError, IndexError):
+            return ""
+
+    def recordEdit(self, first, removed, added):
+        first, removed, added = int(first), int(removed), int(added)
+        delta = added - removed
+        if removed:
+            del self.lineStates[first:first + removed]
+        if added:
+            self.lineStates[first:first] = [self.lineStates[first - 1]] * added
+        if delta:
+            self.staleLines = {n + delta if n > first + removed else n for n in self.staleLines if not first < n <= first + removed}
+        self.staleLines.update(range(first, first + added + 1))
+        self.lineCount += delta
+        self.scheduleHighlight()
+
+    def scheduleHighlight(self):
+        if self.highlightJob is not None:
+            self.root.after_cancel(self.highlightJob)
+        self.highlightJob = self.root.after(HIGHLIGHT_DELAY_MS, self.highlightSyntax)
+
+    def highlightLine(self, lineNum):
+        start = f"{lineNum}.0"
+        end = f"{lineNum}.end"
+        for tag in HIGHLIGHT_TAGS:
+            self.textArea.tag_remove(tag, start, end)
+        spans, inComment = tokenizeLine(self.textArea.get(start, end), self.lineStates[lineNum - 1])
+        for tag, first, last in spans:
+            self.textArea.tag_add(tag, f"{lineNum}.{first}", f"{lineNum}.{last}")
+        self.staleLines.discard(lineNum)
+        if lineNum < self.lineCount and self.lineStates[lineNum] != inComment:
+            self.lineStates[lineNum] = inComment
+            self.staleLines.add(lineNum + 1)
+
+    def highlightRange(self, first, last):
+        for lineNum in range(first, min(last, self.lineCount) + 1):
+            if lineNum in self.staleLines:
+                self.highlightLine(lineNum)
+
     def highlightSyntax(self, event=None):
-        self.textArea.tag_remove("keyword", "1.0", tk.END)
-        self.textArea.tag_remove("variable", "1.0", tk.END)
-        self.textArea.tag_remove("string", "1.0", tk.END)
-        self.textArea.tag_remove("bracket", "1.0", tk.END)
-        self.textArea.tag_remove("comment", "1.0", tk.END)
-        self.textArea.tag_remove("ifstmt", "1.0", tk.END)
-        self.textArea.tag_remove("function", "1.0", tk.END)
-        self.textArea.tag_remove("dollar", "1.0", tk.END)
-        self.textArea.tag_remove("tilde", "1.0", tk.END)
-
-        content = self.textArea.get("1.0", tk.END)
-
-        keywords = ["terminal.print", "cls", "network.ping", "network.http_check", "network.send_packet", "json.parse"]
-        for keyword in keywords:
-            startIndex = "1.0"
-            while True:
-                startIndex = self.textArea.search(keyword, startIndex, stopindex=tk.END)
-                if not startIndex:
+        self.highlightJob = None
+        if self.lineCount != self.currentLineCount():
+            self.rehighlightAll()
+            return
+        first = int(self.textArea.index("@0,0").split('.')[0])
+        last = int(self.textArea.index(f"@0,{self.textArea.winfo_height()}").split('.')[0])
+        self.highlightRange(first, last)
+        if self.staleLines and self.idleJob is None:
+            self.idleJob = self.root.after(HIGHLIGHT_IDLE_MS, self.highlightIdle)
+
+    def highlightIdle(self):
+        self.idleJob = None
+        if not self.staleLines:
+            return
+        first = min(self.staleLines)
+        self.highlightRange(first, first + HIGHLIGHT_IDLE_CHUNK - 1)
+        if self.staleLines:
+            self.idleJob = self.root.after(HIGHLIGHT_IDLE_MS, self.highlightIdle)
+
+    def rehighlightAll(self):
+        for tag in HIGHLIGHT_TAGS:
+            self.textArea.tag_remove(tag, "1.0", tk.END)
+        self.lineCount = self.currentLineCount()
+        self.lineStates = [False] * self.lineCount
+        self.staleLines = set(range(1, self.lineCount + 1))
+        self.highlightSyntax()
+
+    def showRunPanel(self):
+        if not self.runPanelShown:
+            self.panes.add(self.outputArea, stretch="never")
+            self.runPanelShown = True
+
+    def clearOutput(self):
+        self.outputArea.config(state=tk.NORMAL)
+        self.outputArea.delete("1.0", tk.END)
+        linkTags = [tag for tag in self.outputArea.tag_names() if tag.startswith("goto")]
+        if linkTags:
+            self.outputArea.tag_delete(*linkTags)
+        self.runErrors = 0
+        self.outputArea.config(state=tk.DISABLED)
+
+    def appendOutput(self, text, kind="output"):
+        self.outputArea.config(state=tk.NORMAL)
+        if kind == "error":
+            for line in text.splitlines(True):
+                match = errorLinePattern.search(line)
+                if match:
+                    self.runErrors += 1
+                    linkTag = f"goto{self.runErrors}"
+                    lineNum = int(match.group(1))
+                    self.outputArea.tag_bind(linkTag, "<Button-1>", lambda event, lineNum=lineNum: self.gotoLine(lineNum))
+                    self.outputArea.insert(tk.END, line, ("error", "link", linkTag))
+                else:
+                    self.outputArea.insert(tk.END, line, "error")
+        else:
+            self.outputArea.insert(tk.END, text, kind)
+        self.outputArea.config(state=tk.DISABLED)
+        self.outputArea.see(tk.END)
+
+    def gotoLine(self, lineNum):
+        self.textArea.tag_remove("sel", "1.0", tk.END)
+        self.textArea.tag_add("sel", f"{lineNum}.0", f"{lineNum}.end")
+        self.textArea.mark_set("insert", f"{lineNum}.0")
+        self.textArea.see(f"{lineNum}.0")
+        self.textArea.focus_set()
+
+    def runScript(self):
+        if self.runProcess is not None:
+            self.cancelRun()
+        self.showRunPanel()
+        self.clearOutput()
+        code = self.textArea.get("1.0", "end-1c")
+        directory = os.path.dirname(os.path.abspath(self.currentFile)) if self.currentFile else None
+        self.runChannel = multiprocessing.Queue()
+        self.runProcess = multiprocessing.Process(target=runWorker, args=(code, directory, self.runChannel), daemon=True)
+        self.runStarted = time.perf_counter()
+        self.runProcess.start()
+        self.root.after(RUN_POLL_MS, self.pollRun)
+
+    def elapsed(self):
+        return time.perf_counter() - self.runStarted
+
+    def pollRun(self):
+        if self.runProcess is None:
+            return
+        exitCode = None
+        try:
+            for _ in range(RUN_POLL_BATCH):
+                kind, payload = self.runChannel.get_nowait()
+                if kind == "exit":
+                    exitCode = payload
                     break
-                endIndex = f"{startIndex}+{len(keyword)}c"
-                self.textArea.tag_add("keyword", startIndex, endIndex)
-                startIndex = endIndex
-
-        functionPattern = r'def\s+(\w+)\s*:'  
-        for match in re.finditer(functionPattern, content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("function", start, end)
-
-        for match in re.finditer(r'@\w+', content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("variable", start, end)
-
-        for match in re.finditer(r'("[^"]*")', content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("string", start, end)
-
-        for match in re.finditer(r'[\(\)\[\]\{\}]', content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("bracket", start, end)
-
-        for match in re.finditer(r'#.*$', content, re.MULTILINE):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("comment", start, end)
-
-        multilineCommentPattern = r'#\[\[(.*?)\]\]'
-        for match in re.finditer(multilineCommentPattern, content, re.DOTALL):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("comment", start, end)
-
-        ifStatementPattern = r'if\s+@\w+\s*=\s*".*?":'
-        for match in re.finditer(ifStatementPattern, content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("ifstmt", start, end)
-
-        for match in re.finditer(r'\$', content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("dollar", start, end)
-
-        for match in re.finditer(r'~', content):
-            start = f"1.0+{match.start()}c"
-            end = f"1.0+{match.end()}c"
-            self.textArea.tag_add("tilde", start, end)
+                self.appendOutput(payload, kind)
+        except queue.Empty:
+            pass
+
+        if exitCode is not None:
+            self.finishRun(f"Finished with exit code {exitCode} in {self.elapsed():.2f}s")
+        elif not self.runProcess.is_alive() and self.runChannel.empty():
+            self.finishRun(f"Worker stopped unexpectedly (exit code {self.runProcess.exitcode}) after {self.elapsed():.2f}s")
+        else:
+            self.statusBar.config(text=f"Running... {self.elapsed():.1f}s")
+            self.root.after(RUN_POLL_MS, self.pollRun)
+
+    def finishRun(self, message):
+        self.appendOutput(f"\n[{message}]\n", "status")
+        self.statusBar.config(text=message)
+        self.runProcess.join(timeout=1)
+        self.runChannel.close()
+        self.runProcess = None
+        self.runChannel = None
+
+    def cancelRun(self):
+        if self.runProcess is None:
+            return
+        self.runProcess.terminate()
+        self.finishRun(f"Cancelled after {self.elapsed():.2f}s")
 
     def checkUnsavedChanges(self):
         if self.is_modified:
@@ -188,6 +427,7 @@ class VPOLEditor:
 
     def exitApplication(self):
         if self.checkUnsavedChanges():
+            self.cancelRun()
             self.root.quit()
 
 if __name__ == "__main__":
@@ -198,5 +438,5 @@ if __name__ == "__main__":
             content = file.read()
             editor.textArea.insert(tk.END, content)
         editor.currentFile = sys.argv[1]
-        editor.highlightSyntax()
+        editor.rehighlightAll()
     root.mainloop()